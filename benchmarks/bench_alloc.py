@@ -0,0 +1,38 @@
+"""
+BENCH ALLOC — Bytes reservados por foto y por etapa; falla si se supera el presupuesto.
+
+Uso: python -m benchmarks.bench_alloc [--megapixels 12] [--budget 42]
+"""
+import argparse
+import sys
+from benchmarks.suite import _OPTS, _synthetic_jpeg
+from modules.pipeline import process_photo
+from modules.planner import plan_batch
+
+# Bytes allocated per input pixel for a whole photo. Keep it close to the
+# measured figure so an extra frame-sized copy (4 B/px) trips the check.
+ALLOC_BUDGET = 42.0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megapixels", type=float, default=12)
+    parser.add_argument("--budget", type=float, default=ALLOC_BUDGET, help="bytes por píxel de entrada")
+    args = parser.parse_args()
+
+    contents, pixels = _synthetic_jpeg(args.megapixels)
+
+    failed = False
+    for intensity in ("low", "medium", "high"):
+        opts = {**_OPTS, "city": "", "keyword": "", "intensity": intensity}
+        job = plan_batch(1, opts, seed=0).row(0)
+        _, stages, _ = process_photo(contents, job)
+        per_px = sum(stages.values()) / pixels
+        detail = ", ".join(f"{k}={v / pixels:.1f}" for k, v in stages.items())
+        status = "OK" if per_px <= args.budget else "OVER BUDGET"
+        failed |= per_px > args.budget
+        print(f"{intensity:>6}: {per_px:5.1f} B/px ({sum(stages.values()) / 1e6:.0f} MB) [{detail}] {status}")
+    if failed:
+        sys.exit(f"allocation budget of {args.budget} B/px exceeded")
+
+if __name__ == "__main__":
+    main()
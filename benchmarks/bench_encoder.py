@@ -0,0 +1,43 @@
+"""
+BENCH ENCODER — Tiempo de codificación y tamaño de salida por perfil (fast / balanced / compact).
+
+Codifica la salida de uniquify_image del corpus sintético de benchmarks.suite
+con cada perfil, a las calidades del plan por intensidad.
+
+Uso: python -m benchmarks.bench_encoder [--sizes 1,12] [--repeat 3]
+"""
+import argparse
+import time
+from io import BytesIO
+from PIL import Image
+from benchmarks.suite import _OPTS, _synthetic_jpeg
+from modules.pipeline import ENCODER_PROFILES, encode_jpeg
+from modules.planner import plan_batch
+from modules.uniquifier import uniquify_image
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1,12", help="megapíxeles, separados por comas")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for mp in (float(s) for s in args.sizes.split(",")):
+        jpeg, pixels = _synthetic_jpeg(mp)
+        img = Image.open(BytesIO(jpeg))
+        img.load()
+        print(f"{mp:g} MP")
+        for intensity in ("low", "medium", "high"):
+            row = plan_batch(1, {**_OPTS, "intensity": intensity}, seed=0).row(0)
+            unique = uniquify_image(img, row["uniquify"])
+            base = None
+            for profile in ENCODER_PROFILES:
+                best = float("inf")
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    size = encode_jpeg(unique, row["quality"], profile).getbuffer().nbytes
+                    best = min(best, time.perf_counter() - start)
+                base = base or (best, size)
+                print(f"  {intensity:>6} q={row['quality']} {profile:<9} {best * 1000:9.1f} ms ({best / base[0] * 100:4.0f}%) {size / 1e6:7.2f} MB ({size / base[1] * 100:5.1f}%)")
+
+if __name__ == "__main__":
+    main()
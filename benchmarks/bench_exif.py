@@ -0,0 +1,26 @@
+"""
+BENCH EXIF — Mide las plantillas EXIF por dispositivo frente a piexif.dump.
+
+Que ambos den los mismos bytes lo comprueba tests/test_injector.py.
+
+Uso: python -m benchmarks.bench_exif [--repeat 2000]
+"""
+import argparse
+import piexif
+from benchmarks.suite import _time
+from data.colombia import DEVICE_PROFILES
+from modules.injector import build_exif, build_exif_bytes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    kwargs = dict(lat=4.6097, lon=-74.0817, altitude=2640, device_profile=DEVICE_PROFILES[0], image_width=4000, image_height=3000, keyword="plomero", city_name="Bogotá")
+    old = _time(lambda: piexif.dump(build_exif(**kwargs)), args.repeat)
+    new = _time(lambda: build_exif_bytes(**kwargs), args.repeat)
+    print(f"  build_exif + piexif.dump: {old * 1e6:8.1f} us")
+    print(f"  template patch:           {new * 1e6:8.1f} us  ({old / new:.1f}x)")
+
+if __name__ == "__main__":
+    main()
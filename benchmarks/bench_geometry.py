@@ -0,0 +1,50 @@
+"""
+BENCH GEOMETRY — Costo por megapíxel de la etapa geométrica (rotar + recortar [+ reducir]).
+
+Compara el camino anterior (rotate a cuadro completo, crop y resize por separado)
+con la transformada afín única de uniquify_image.
+
+Uso: python -m benchmarks.bench_geometry [--sizes 1,12,48] [--repeat 5]
+"""
+import argparse
+import numpy as np
+from PIL import Image
+from benchmarks.suite import _frame_size, _time
+from modules.uniquifier import _geometric_transform
+
+_ANGLE = 0.5
+_CROP = (4, 6, 3, 5)
+
+def _before(img, max_dimension=None):
+    w, h = img.size
+    out = img.rotate(_ANGLE, resample=Image.BICUBIC, expand=False, fillcolor=(255, 255, 255))
+    out = out.crop((_CROP[0], _CROP[1], w - _CROP[2], h - _CROP[3]))
+    if max_dimension:
+        ratio = max_dimension / max(out.size)
+        out = out.resize((round(out.width * ratio), round(out.height * ratio)), Image.LANCZOS)
+    return out
+
+def _after(img, max_dimension=None):
+    w, h = img.size
+    scale = max(1.0, max(w - _CROP[0] - _CROP[2], h - _CROP[1] - _CROP[3]) / max_dimension) if max_dimension else 1.0
+    return _geometric_transform(img, _ANGLE, _CROP, scale)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1,12,48", help="megapíxeles separados por coma")
+    parser.add_argument("--max-dimension", type=int, default=2048)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'MP':>6} {'mode':>10} {'before ms/MP':>13} {'after ms/MP':>12} {'speedup':>8}")
+    for mp in (float(v) for v in args.sizes.split(",")):
+        w, h = _frame_size(mp)
+        img = Image.fromarray(rng.integers(0, 256, (h, w, 3), dtype=np.uint8))
+        for label, max_dim in (("rot+crop", None), (f"+fit {args.max_dimension}", args.max_dimension)):
+            before = _time(lambda: _before(img, max_dim), args.repeat) * 1000 / mp
+            after = _time(lambda: _after(img, max_dim), args.repeat) * 1000 / mp
+            print(f"{mp:6g} {label:>10} {before:13.2f} {after:12.2f} {before / after:7.1f}x")
+
+if __name__ == "__main__":
+    main()
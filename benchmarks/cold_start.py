@@ -0,0 +1,152 @@
+"""
+COLD START — Mide el arranque en frío: tiempo de `import main` y latencia de la primera petición por endpoint.
+
+Cada medición corre en un proceso nuevo, como una invocación fría en Vercel:
+importa main, levanta la app (eventos de inicio incluidos) y hace una sola
+petición al endpoint. Reporta la mediana de varias corridas, falla si el
+import supera el presupuesto o si carga módulos pesados (NumPy, Pillow,
+httpx...) que deberían esperar a su primer uso, y compara contra una línea
+base guardada igual que benchmarks.suite.
+
+Uso: python -m benchmarks.cold_start [--runs 5] [--endpoints home,cities,static,...] [--budget-ms 750]
+                                     [--output cold.json] [--baseline base.json] [--threshold 0.25] [--save-baseline base.json]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+from io import BytesIO
+
+# Modules `import main` must not load; each belongs to the endpoints that use it.
+HEAVY_MODULES = ("numpy", "PIL", "piexif", "httpx", "requests", "jinja2")
+
+# name: (method, path, form data, upload the sample JPEG as this field)
+ENDPOINTS = {
+    "home": ("GET", "/", None, None),
+    "cities": ("GET", "/api/cities", None, None),
+    "static": ("GET", "/static/app.js", None, None),
+    "metrics": ("GET", "/metrics", None, None),
+    "geocode_city": ("POST", "/api/geocode", {"city": "Bogotá"}, None),
+    "verify": ("POST", "/api/verify", None, "file"),
+    "sanitize": ("POST", "/api/sanitize", {"city": "Bogotá", "output": "jpeg"}, "files"),
+}
+
+# Runs in the fresh interpreter; TestClient (and the httpx it needs) is
+# imported after the measured import so it doesn't count against main.
+_CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import main
+import_s = time.perf_counter() - start
+heavy = [m for m in json.loads(sys.argv[1]) if m in sys.modules]
+from fastapi.testclient import TestClient
+method, path, data, field, sample = json.loads(sys.argv[2])
+files = {field: ("foto.jpg", open(sample, "rb").read(), "image/jpeg")} if field else None
+with TestClient(main.app) as client:
+    start = time.perf_counter()
+    resp = client.request(method, path, data=data, files=files)
+    first_s = time.perf_counter() - start
+    start = time.perf_counter()
+    client.request(method, path, data=data, files=files)
+    warm_s = time.perf_counter() - start
+print(json.dumps({"import_s": import_s, "first_s": first_s, "warm_s": warm_s, "status": resp.status_code, "heavy": heavy}))
+"""
+
+def _sample_jpeg(directory):
+    from PIL import Image
+    buf = BytesIO()
+    Image.new("RGB", (640, 480), (120, 160, 200)).save(buf, "JPEG", quality=85)
+    path = os.path.join(directory, "cold_start.jpg")
+    with open(path, "wb") as f:
+        f.write(buf.getvalue())
+    return path
+
+def _cold_run(endpoint, sample):
+    method, path, data, field = ENDPOINTS[endpoint]
+    # No bytecode cache writes: a fresh serverless instance may not have one either.
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    out = subprocess.run(
+        [sys.executable, "-c", _CHILD, json.dumps(HEAVY_MODULES), json.dumps([method, path, data, field, sample])],
+        capture_output=True, text=True, env=env, cwd=os.getcwd(),
+    )
+    if out.returncode != 0:
+        raise RuntimeError(f"{endpoint}: el proceso hijo falló\n{out.stderr}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def run(endpoints, runs):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        sample = _sample_jpeg(tmp)
+        for name in endpoints:
+            samples = [_cold_run(name, sample) for _ in range(runs)]
+            import_s = statistics.median(s["import_s"] for s in samples)
+            first_s = statistics.median(s["first_s"] for s in samples)
+            warm_s = statistics.median(s["warm_s"] for s in samples)
+            results[name] = {
+                "import_s": import_s, "first_s": first_s, "cold_s": import_s + first_s, "warm_s": warm_s,
+                "status": samples[-1]["status"], "heavy": samples[-1]["heavy"],
+            }
+            print(f"  {name:<14} import {import_s * 1000:7.1f} ms  first {first_s * 1000:8.1f} ms  warm {warm_s * 1000:7.1f} ms  [{samples[-1]['status']}]")
+    return results
+
+def check_budget(results, budget_s):
+    """Problems with the import itself, the same for every endpoint: too slow, or eager heavy imports."""
+    problems = []
+    import_s = statistics.median(r["import_s"] for r in results.values())
+    if import_s > budget_s:
+        problems.append(f"import main: {import_s * 1000:.0f} ms, budget {budget_s * 1000:.0f} ms")
+    heavy = sorted({m for r in results.values() for m in r["heavy"]})
+    if heavy:
+        problems.append(f"import main loads {', '.join(heavy)}")
+    return problems
+
+def compare(results, baseline, threshold):
+    """Endpoints whose cold time (import + first request) is over baseline * (1 + threshold)."""
+    regressions = []
+    for name, r in results.items():
+        base = baseline.get(name)
+        if base and r["cold_s"] > base["cold_s"] * (1 + threshold):
+            regressions.append(f"{name}: {r['cold_s'] * 1000:.0f} ms vs {base['cold_s'] * 1000:.0f} ms (+{(r['cold_s'] / base['cold_s'] - 1) * 100:.0f}%)")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="procesos nuevos por endpoint")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help="separados por comas")
+    parser.add_argument("--budget-ms", type=float, default=750, help="presupuesto para `import main` (mediana)")
+    parser.add_argument("--output", help="archivo JSON con los resultados")
+    parser.add_argument("--baseline", help="resultados JSON anteriores para comparar")
+    parser.add_argument("--threshold", type=float, default=0.25, help="regresión tolerada (0.25 = 25%% más lento)")
+    parser.add_argument("--save-baseline", help="guarda estos resultados como nueva línea base")
+    args = parser.parse_args()
+
+    endpoints = [e for e in args.endpoints.split(",") if e]
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"endpoints desconocidos: {', '.join(sorted(unknown))}")
+    print(f"cold start, mediana de {args.runs} procesos por endpoint")
+    results = run(endpoints, args.runs)
+    report = {
+        "meta": {"python": platform.python_version(), "machine": platform.machine(), "processor": platform.processor(), "runs": args.runs},
+        "results": results,
+    }
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2)
+
+    problems = check_budget(results, args.budget_ms / 1000)
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems += compare(results, json.load(f)["results"], args.threshold)
+    if problems:
+        print("\n".join(["COLD START PROBLEMS:"] + problems))
+        sys.exit(f"{len(problems)} cold-start check(s) failed")
+    print(f"import within {args.budget_ms:.0f} ms, no heavy module loaded eagerly" + (f", no endpoint regressed more than {args.threshold:.0%} vs {args.baseline}" if args.baseline else ""))
+
+if __name__ == "__main__":
+    main()
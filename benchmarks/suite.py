@@ -0,0 +1,167 @@
+"""
+SUITE — Micro-benchmarks por etapa con JPEGs sintéticos; compara contra una línea base guardada.
+
+Mide decodificación, strip_all_metadata, uniquify_image (low/medium/high),
+codificación JPEG con y sin optimize, EXIF, inyección y escritura ZIP.
+Reporta MP/s y pico de RSS por etapa, guarda JSON y falla si alguna etapa
+es más lenta que la línea base por encima del umbral.
+
+Uso: python -m benchmarks.suite [--sizes 1,12,48,108] [--repeat 3] [--output bench.json]
+                                [--baseline base.json] [--threshold 0.15] [--save-baseline base.json]
+"""
+import argparse
+import json
+import platform
+import resource
+import sys
+import time
+import zipfile
+from io import BytesIO
+import numpy as np
+import PIL
+from PIL import Image
+from modules.injector import build_exif_bytes, inject_exif
+from modules.planner import plan_batch
+from modules.stripper import strip_all_metadata
+from modules.uniquifier import uniquify_image
+from modules.zipstream import ZipStream
+
+# Stages this fast are timer noise; they only count as regressed past this many seconds extra.
+_NOISE_FLOOR = 50e-6
+
+_OPTS = {"location": {"lat": 4.6097, "lon": -74.0817, "altitude": 2640}, "city": "Bogotá", "keyword": "cafe", "date_from": "2024-01-01T00:00:00", "date_to": "2024-01-31T00:00:00", "jitter_radius": 30.0, "device_id": None, "random_device": True, "max_dimension": None}
+
+def _frame_size(megapixels):
+    """(width, height) of a 4:3 frame of about `megapixels`."""
+    w = int((megapixels * 1e6 * 4 / 3) ** 0.5)
+    return w, int(w * 3 / 4)
+
+def _synthetic_jpeg(megapixels):
+    # Gradients plus mild noise: compresses like a photo, unlike pure noise.
+    w, h = _frame_size(megapixels)
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 255, w, dtype=np.float32)
+    arr = np.empty((h, w, 3), dtype=np.uint8)
+    for y0 in range(0, h, 512):
+        y = np.linspace(y0, min(h, y0 + 512) - 1, min(h, y0 + 512) - y0, dtype=np.float32)[:, None] * (255 / h)
+        band = np.stack([x + 0 * y, (x + y) / 2, 255 - y + 0 * x], axis=-1)
+        band += rng.normal(0, 6, band.shape).astype(np.float32)
+        arr[y0:y0 + 512] = np.clip(band, 0, 255)
+    buf = BytesIO()
+    Image.fromarray(arr).save(buf, "JPEG", quality=90)
+    return buf.getvalue(), w * h
+
+def _reset_peak():
+    # Linux lets a process reset its own RSS high-water mark (VmHWM); elsewhere
+    # the figure is the process-wide peak so far.
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+def _peak_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+def _time(fn, repeat):
+    """Best-of-`repeat` wall time of `fn`."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def _measure(fn, repeat):
+    """_time() and the RSS peak while running `fn`."""
+    _reset_peak()
+    return _time(fn, repeat), _peak_rss_mb()
+
+def run(sizes, repeat):
+    results = {}
+    for mp in sizes:
+        jpeg, pixels = _synthetic_jpeg(mp)
+        decoded = Image.open(BytesIO(jpeg))
+        decoded.load()
+        rows = {i: plan_batch(1, {**_OPTS, "intensity": i}, seed=0).row(0) for i in ("low", "medium", "high")}
+        unique = uniquify_image(decoded, rows["medium"]["uniquify"])
+        encoded = BytesIO()
+        unique.save(encoded, "JPEG", quality=90)
+        encoded = encoded.getvalue()
+        job = rows["medium"]
+        exif = build_exif_bytes(lat=job["lat"], lon=job["lon"], altitude=job["altitude"], timestamp=job["timestamp"], device_profile=job["device"], image_width=unique.width, image_height=unique.height, keyword=job["keyword"], city_name=job["city"], **job["exif"])
+
+        def decode():
+            img = Image.open(BytesIO(jpeg))
+            img.load()
+
+        stages = {
+            "decode": decode,
+            "strip": lambda: strip_all_metadata(decoded),
+            "uniquify_low": lambda: uniquify_image(decoded, rows["low"]["uniquify"]),
+            "uniquify_medium": lambda: uniquify_image(decoded, rows["medium"]["uniquify"]),
+            "uniquify_high": lambda: uniquify_image(decoded, rows["high"]["uniquify"]),
+            "encode": lambda: unique.save(BytesIO(), "JPEG", quality=90),
+            "encode_optimize": lambda: unique.save(BytesIO(), "JPEG", quality=90, optimize=True),
+            "build_exif": lambda: build_exif_bytes(lat=job["lat"], lon=job["lon"], altitude=job["altitude"], timestamp=job["timestamp"], device_profile=job["device"], image_width=unique.width, image_height=unique.height, keyword=job["keyword"], city_name=job["city"], **job["exif"]),
+            "inject_exif": lambda: inject_exif(encoded, exif),
+            "zip_write": lambda: ZipStream(zipfile.ZIP_STORED).add("foto.jpg", encoded),
+        }
+        label = f"{mp:g}MP"
+        results[label] = {}
+        print(f"{label} ({pixels / 1e6:.1f} MP, JPEG {len(jpeg) / 1e6:.1f} MB)")
+        for name, fn in stages.items():
+            seconds, rss = _measure(fn, repeat)
+            results[label][name] = {"seconds": seconds, "mp_per_s": pixels / 1e6 / seconds, "peak_rss_mb": rss}
+            print(f"  {name:<16} {seconds * 1000:10.2f} ms {pixels / 1e6 / seconds:10.1f} MP/s {rss:8.0f} MB RSS")
+        del decoded, unique
+    return results
+
+def compare(results, baseline, threshold):
+    """Stages slower than baseline * (1 + threshold), as printable lines."""
+    regressions = []
+    for label, stages in results.items():
+        for name, r in stages.items():
+            base = baseline.get(label, {}).get(name)
+            if base and r["seconds"] > base["seconds"] * (1 + threshold) + _NOISE_FLOOR:
+                regressions.append(f"{label} {name}: {r['seconds'] * 1000:.2f} ms vs {base['seconds'] * 1000:.2f} ms (+{(r['seconds'] / base['seconds'] - 1) * 100:.0f}%)")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1,12,48,108", help="megapíxeles, separados por comas")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="archivo JSON con los resultados")
+    parser.add_argument("--baseline", help="resultados JSON anteriores para comparar")
+    parser.add_argument("--threshold", type=float, default=0.15, help="regresión tolerada (0.15 = 15%% más lento)")
+    parser.add_argument("--save-baseline", help="guarda estos resultados como nueva línea base")
+    args = parser.parse_args()
+
+    results = run([float(s) for s in args.sizes.split(",")], args.repeat)
+    report = {
+        "meta": {"python": platform.python_version(), "pillow": PIL.__version__, "numpy": np.__version__, "machine": platform.machine(), "processor": platform.processor(), "repeat": args.repeat},
+        "results": results,
+    }
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)["results"], args.threshold)
+        if regressions:
+            print("\n".join(["REGRESSIONS:"] + regressions))
+            sys.exit(f"{len(regressions)} stage(s) regressed more than {args.threshold:.0%}")
+        print(f"no stage regressed more than {args.threshold:.0%} vs {args.baseline}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+CLI — Procesa un árbol de carpetas sin pasar por HTTP, en paralelo y con un manifiesto reanudable.
+
+Escribe cada foto directamente en la carpeta de salida (misma estructura de
+subcarpetas) y registra en un manifiesto JSONL el hash de la entrada, el
+nombre de salida, el estado y los tiempos por etapa. Si la ejecución se
+interrumpe, volver a lanzarla salta las fotos ya terminadas y repite el
+mismo plan (la semilla queda guardada en el manifiesto).
+
+Uso: python cli.py ENTRADA SALIDA (--city Bogotá | --address "Cra 7 # 72-41" --city Bogotá | --lat 4.6 --lon -74.08)
+                   [--keyword "café"] [--intensity medium] [--workers N] [--seed S] [--manifest ruta.jsonl]
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timedelta
+from io import BytesIO
+from pathlib import Path
+from data.colombia import DEVICE_PROFILES
+from modules.geocoder import geocode_address, geocode_city
+from modules.ingest import probe
+from modules.pipeline import DEFAULT_ENCODER_PROFILE, ENCODER_PROFILES, output_name, process_photo
+from modules.planner import new_seed, plan_batch
+
+EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".tif", ".tiff", ".bmp", ".heic"}
+
+def _options(args):
+    if args.lat is not None and args.lon is not None:
+        location = {"lat": args.lat, "lon": args.lon, "altitude": args.alt or 100}
+    elif args.address:
+        location = geocode_address(args.address, args.city)
+        if not location:
+            sys.exit("No se pudo geocodificar la dirección.")
+    elif args.city:
+        location = geocode_city(args.city)
+        if not location:
+            sys.exit(f"Ciudad '{args.city}' no encontrada.")
+    else:
+        sys.exit("Indica --city, --address o --lat/--lon.")
+    dt_to = datetime.strptime(args.date_to, "%Y-%m-%d") if args.date_to else datetime.now()
+    dt_from = datetime.strptime(args.date_from, "%Y-%m-%d") if args.date_from else dt_to - timedelta(days=30)
+    if dt_to < dt_from:
+        dt_from, dt_to = dt_to, dt_from
+    device_id = None if args.device == "random" else int(args.device)
+    if device_id is not None and not 0 <= device_id < len(DEVICE_PROFILES):
+        sys.exit(f"--device debe estar entre 0 y {len(DEVICE_PROFILES) - 1}.")
+    return {
+        "location": location, "city": args.city, "keyword": args.keyword.strip(), "intensity": args.intensity,
+        "date_from": dt_from.isoformat(), "date_to": dt_to.isoformat(), "jitter_radius": args.jitter,
+        "device_id": device_id, "random_device": device_id is None,
+        "max_dimension": args.max_dimension or None, "seed": None, "encoder_profile": args.encoder_profile,
+    }
+
+def _inputs(root):
+    return sorted(p for p in root.rglob("*") if p.is_file() and p.suffix.lower() in EXTENSIONS)
+
+def _read_manifest(path):
+    """(latest run header or None, {input: latest entry}) from an existing manifest."""
+    run, entries = None, {}
+    if not path.exists():
+        return run, entries
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # a line cut short by the interruption
+            if "run" in record:
+                run = record["run"]
+            else:
+                entries[record["input"]] = record
+    return run, entries
+
+def _is_done(entry, path, out_dir):
+    if not entry or entry["status"] != "ok":
+        return False
+    stat = path.stat()
+    return entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns and (out_dir / entry["output"]).exists()
+
+def _output_names(files, root, opts, previous):
+    """{input: output path} for this run, both relative to their roots.
+
+    Inputs seen in an earlier run keep the output the manifest recorded for
+    them, whatever their position now. New inputs get their usual name
+    unless another input (present or recorded) already uses it; then the
+    keyword counter moves past the batch, or the name gets a -2, -3...
+    suffix, so no photo is ever written over another one's output.
+    """
+    rels = [p.relative_to(root).as_posix() for p in files]
+    names = {rel: previous[rel]["output"] for rel in rels if rel in previous}
+    taken = {entry["output"] for entry in previous.values()}
+    counter = len(files)
+    for idx, (rel, path) in enumerate(zip(rels, files)):
+        if rel in names:
+            continue
+        parent = Path(rel).parent
+        name = (parent / output_name(opts, idx, path.name)).as_posix()
+        stem, ext = os.path.splitext(name)
+        suffix = 2
+        while name in taken:
+            if opts["keyword"]:
+                name = (parent / output_name(opts, counter, path.name)).as_posix()
+                counter += 1
+            else:
+                name = f"{stem}-{suffix}{ext}"
+                suffix += 1
+        names[rel] = name
+        taken.add(name)
+    return names
+
+def _process_file(src, dst, job):
+    """Worker: one photo from disk to disk. The output appears atomically."""
+    start = time.perf_counter()
+    record = {"size": 0, "mtime_ns": 0}
+    try:
+        stat = os.stat(src)
+        record.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+        with open(src, "rb") as f:
+            contents = f.read()
+        record["sha256"] = hashlib.sha256(contents).hexdigest()
+        _, width, height = probe(BytesIO(contents))
+        final, _, stages = process_photo(contents, job)
+        del contents
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        tmp = f"{dst}.part"
+        with open(tmp, "wb") as f:
+            f.write(final)
+        os.replace(tmp, dst)
+        record.update(status="ok", megapixels=width * height / 1e6, bytes_out=len(final), stages=stages)
+    except Exception as e:
+        record.update(status="error", error=str(e))
+    record["seconds"] = time.perf_counter() - start
+    return record
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", type=Path)
+    parser.add_argument("output", type=Path)
+    parser.add_argument("--city", default="")
+    parser.add_argument("--address", default="")
+    parser.add_argument("--lat", type=float)
+    parser.add_argument("--lon", type=float)
+    parser.add_argument("--alt", type=float)
+    parser.add_argument("--keyword", default="")
+    parser.add_argument("--intensity", choices=("low", "medium", "high"), default="medium")
+    parser.add_argument("--jitter", type=float, default=30.0, help="radio GPS en metros")
+    parser.add_argument("--date-from", help="AAAA-MM-DD")
+    parser.add_argument("--date-to", help="AAAA-MM-DD")
+    parser.add_argument("--device", default="random", help="índice de DEVICE_PROFILES o 'random'")
+    parser.add_argument("--max-dimension", type=int, default=0)
+    parser.add_argument("--encoder-profile", choices=tuple(ENCODER_PROFILES), default=DEFAULT_ENCODER_PROFILE)
+    parser.add_argument("--seed", type=int, help="semilla del plan; por defecto la del manifiesto o una nueva")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--manifest", type=Path, help="por defecto SALIDA/manifest.jsonl")
+    args = parser.parse_args()
+
+    if not args.input.is_dir():
+        sys.exit(f"{args.input} no es una carpeta.")
+    args.output.mkdir(parents=True, exist_ok=True)
+    manifest_path = args.manifest or args.output / "manifest.jsonl"
+    run, previous = _read_manifest(manifest_path)
+
+    opts = _options(args)
+    opts["seed"] = args.seed if args.seed is not None else (int(run["seed"]) if run else new_seed())
+    if run and args.seed is None:
+        # Resuming: keep the interrupted run's date window too, so the plan comes out identical.
+        opts["date_from"] = run["options"]["date_from"] if args.date_from is None else opts["date_from"]
+        opts["date_to"] = run["options"]["date_to"] if args.date_to is None else opts["date_to"]
+    files = _inputs(args.input)
+    plan = plan_batch(len(files), opts, opts["seed"])
+
+    names = _output_names(files, args.input, opts, previous)
+    todo = []
+    skipped = 0
+    for idx, path in enumerate(files):
+        rel = path.relative_to(args.input).as_posix()
+        if _is_done(previous.get(rel), path, args.output):
+            skipped += 1
+            continue
+        todo.append((idx, rel, names[rel]))
+    print(f"{len(files)} fotos en {args.input}: {skipped} ya procesadas, {len(todo)} pendientes ({args.workers} procesos)")
+
+    ok = errors = 0
+    mp = bytes_in = bytes_out = 0
+    stage_totals = {}
+    start = time.perf_counter()
+    with open(manifest_path, "a", encoding="utf-8") as manifest, ProcessPoolExecutor(max_workers=args.workers) as pool:
+        if run is None or args.seed is not None:
+            manifest.write(json.dumps({"run": {"seed": str(opts["seed"]), "started": datetime.now().isoformat(timespec="seconds"), "options": {k: v for k, v in opts.items() if k != "seed"}}}, ensure_ascii=False) + "\n")
+        pending = {}
+        queue = deque(todo)
+        # Keep at most two photos per worker in flight so memory stays bounded.
+        while queue or pending:
+            while queue and len(pending) < args.workers * 2:
+                idx, rel, out_rel = queue.popleft()
+                future = pool.submit(_process_file, str(args.input / rel), str(args.output / out_rel), plan.row(idx))
+                pending[future] = (rel, out_rel)
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                rel, out_rel = pending.pop(future)
+                record = {"input": rel, "output": out_rel, **future.result()}
+                manifest.write(json.dumps(record, ensure_ascii=False) + "\n")
+                manifest.flush()
+                bytes_in += record["size"]
+                if record["status"] == "ok":
+                    ok += 1
+                    mp += record["megapixels"]
+                    bytes_out += record["bytes_out"]
+                    for stage, seconds in record["stages"].items():
+                        stage_totals[stage] = stage_totals.get(stage, 0.0) + seconds
+                else:
+                    errors += 1
+                    print(f"  ERROR {rel}: {record['error']}", file=sys.stderr)
+                if (ok + errors) % 50 == 0:
+                    print(f"  {ok + errors}/{len(todo)}")
+    elapsed = time.perf_counter() - start
+
+    print(f"Procesadas: {ok}/{len(todo)} ({errors} errores, {skipped} saltadas) en {elapsed:.1f} s")
+    if ok:
+        print(f"  {ok / elapsed:.2f} fotos/s, {mp / elapsed:.1f} MP/s, {bytes_in / 1e6:.0f} MB leídos, {bytes_out / 1e6:.0f} MB escritos")
+        print("  tiempo medio por etapa: " + ", ".join(f"{k}={v / ok * 1000:.0f} ms" for k, v in stage_totals.items()))
+    print(f"Manifiesto: {manifest_path}")
+    if errors:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
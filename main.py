@@ -1,32 +1,57 @@
 """
 GMB Photo Sanitizer — API principal.
 """
-import os, random, zipfile, traceback, logging, unicodedata, re
+import asyncio, json, os, time, traceback, logging, zipfile
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("gmb-sanitizer")
+from collections import deque
+from functools import lru_cache
 from datetime import datetime, timedelta
 from io import BytesIO
 from typing import Optional
-from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from urllib.parse import quote
+from fastapi import Depends, FastAPI, File, Form, HTTPException, UploadFile
 from fastapi.requests import Request
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
-from PIL import Image
 from data.colombia import CITIES, DEVICE_PROFILES
-from modules.geocoder import add_jitter, geocode_address, geocode_city
-from modules.injector import build_exif, inject_exif
-from modules.stripper import strip_all_metadata
-from modules.uniquifier import uniquify_image
-
-def _slugify(text: str) -> str:
-    """Convert text to URL/filename-friendly slug."""
-    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
-    text = text.lower().strip()
-    text = re.sub(r'[^a-z0-9\s-]', '', text)
-    text = re.sub(r'[\s_-]+', '-', text)
-    text = text.strip('-')
-    return text or 'foto'
+from modules.engine import get_engine
+from modules.geoclient import close_geo_clients
+from modules.geocoder import geocode_address_async, geocode_city
+from modules.ingest import RequestTooLarge, admit
+from modules.jobs import SPOOL_DIR, get_job_runner
+from modules import metrics
+from modules.admission import get_scheduler, peak_bytes
+from modules.precomputed import Precomputed
+from modules.pipeline import DEFAULT_ENCODER_PROFILE, ENCODER_PROFILES, output_name, process_photo
+from modules.tarstream import TarStream
+from modules.zipstream import ZipStream
+
+def _report(processed, total, errors_list):
+    report = f"Procesadas: {processed}/{total}\n"
+    if errors_list:
+        report += "\nErrores:\n" + "\n".join(errors_list)
+    return report.encode("utf-8")
+
+def _detach_upload(file: UploadFile):
+    """Take over an upload's spooled file so it outlives the request handler.
+
+    FastAPI closes the form's UploadFiles when the handler returns, but a
+    streamed response keeps reading them afterwards.
+    """
+    spool = file.file
+    file.file = BytesIO()
+    return spool
+
+async def _admit(files):
+    """Detach and check every upload (headers only); 413 when the request is over budget."""
+    received = [(f.filename, f.content_type, _detach_upload(f)) for f in files]
+    try:
+        return await asyncio.to_thread(admit, received)
+    except RequestTooLarge as e:
+        for _, _, spool in received:
+            spool.close()
+        raise HTTPException(413, str(e))
 
 from pathlib import Path
 
@@ -35,6 +60,9 @@ BASE_DIR = Path(__file__).resolve().parent
 STATIC_DIR = BASE_DIR / "static"
 TEMPLATES_DIR = BASE_DIR / "templates"
 
+# Longest output side in pixels when the request does not set one; 0 keeps the original size.
+DEFAULT_MAX_DIMENSION = int(os.environ.get("GMB_MAX_DIMENSION", "0") or 0)
+
 app = FastAPI(title="GMB Photo Sanitizer", version="1.0.0")
 
 from starlette.middleware.cors import CORSMiddleware
@@ -43,26 +71,74 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["X-GMB-Processed", "X-GMB-Total", "X-GMB-Errors", "Content-Disposition"],
+    expose_headers=["X-GMB-Processed", "X-GMB-Total", "X-GMB-Errors", "X-GMB-Seed", "Content-Disposition"],
 )
 
+@app.middleware("http")
+async def _count_requests(request: Request, call_next):
+    response = await call_next(request)
+    # Label by route template, not raw path, so job ids don't explode the series.
+    route = request.scope.get("route")
+    metrics.REQUESTS.inc(route=getattr(route, "path", "other"), method=request.method, status=response.status_code)
+    return response
+
 app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
-templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
 
-@app.get("/")
-async def home(request: Request):
+# Heavy imports wait for the endpoint that needs them (Jinja2 here, NumPy in
+# the planner, Pillow in the pipeline): on Vercel every cold start imports
+# this module, whatever the first request is. benchmarks/cold_start.py
+# keeps an eye on it.
+@lru_cache(maxsize=1)
+def _templates():
+    from fastapi.templating import Jinja2Templates
+    return Jinja2Templates(directory=str(TEMPLATES_DIR))
+
+@app.on_event("startup")
+async def _resume_jobs():
+    # Pick up batches left queued or half-done by a worker that went away.
+    # The runner only resumes jobs this process claims; ones another worker
+    # still holds are rechecked once per lease in case that worker dies.
+    if (SPOOL_DIR / "jobs.sqlite3").exists() and get_job_runner().store.unfinished(claimed=True):
+        get_job_runner().start()
+
+@app.on_event("shutdown")
+async def _shutdown_engine():
+    await get_job_runner().stop()
+    await close_geo_clients()
+    get_engine().shutdown()
+
+@app.get("/metrics")
+async def api_metrics():
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+# The page and the city table only change with a deploy: each is rendered,
+# hashed and compressed once per process, on its first request.
+@lru_cache(maxsize=1)
+def _home_page():
     cities = sorted(CITIES.keys())
     devices = [{"id": i, "label": f"{d['make']} {d['model_name']}"} for i, d in enumerate(DEVICE_PROFILES)]
-    return templates.TemplateResponse("index.html", {"request": request, "cities": cities, "devices": devices})
+    html = _templates().get_template("index.html").render(cities=cities, devices=devices)
+    # Revalidate every time so a deploy shows up at once; unchanged pages are a 304.
+    return Precomputed(html.encode("utf-8"), "text/html", "no-cache")
+
+@lru_cache(maxsize=1)
+def _cities_payload():
+    cities = {name: {"department": d["department"], "lat": d["lat"], "lon": d["lon"], "altitude": d["altitude"]} for name, d in sorted(CITIES.items())}
+    body = json.dumps(cities, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return Precomputed(body, "application/json", "public, max-age=3600")
+
+@app.get("/")
+async def home(request: Request):
+    return _home_page().response(request)
 
 @app.get("/api/cities")
-async def api_cities():
-    return JSONResponse({name: {"department": d["department"], "lat": d["lat"], "lon": d["lon"], "altitude": d["altitude"]} for name, d in sorted(CITIES.items())})
+async def api_cities(request: Request):
+    return _cities_payload().response(request)
 
 @app.post("/api/geocode")
 async def api_geocode(address: str = Form(""), city: str = Form("")):
     if address:
-        result = geocode_address(address, city)
+        result = await geocode_address_async(address, city)
     elif city:
         result = geocode_city(city)
     else:
@@ -71,9 +147,8 @@ async def api_geocode(address: str = Form(""), city: str = Form("")):
         raise HTTPException(404, "No se encontró la ubicación.")
     return JSONResponse(result)
 
-@app.post("/api/sanitize")
-async def api_sanitize(
-    files: list[UploadFile] = File(...),
+async def sanitize_options(
+    request: Request,
     city: str = Form(""),
     address: str = Form(""),
     manual_lat: Optional[str] = Form(""),
@@ -87,7 +162,13 @@ async def api_sanitize(
     date_to: str = Form(""),
     random_device_per_photo: str = Form("true"),
     keyword: str = Form(""),
+    max_dimension: str = Form(""),
+    seed: str = Form(""),
+    encoder_profile: str = Form(""),
 ):
+    """Validate the sanitize form fields into a JSON-serializable options dict."""
+    start = time.perf_counter()
+    request.state.server_timing = timing = {}
     try:
         m_lat = float(manual_lat) if manual_lat else None
         m_lon = float(manual_lon) if manual_lon else None
@@ -98,7 +179,9 @@ async def api_sanitize(
     if m_lat is not None and m_lon is not None:
         location = {"lat": m_lat, "lon": m_lon, "altitude": m_alt or 100, "postal_code": postal_code or "110111"}
     elif address:
-        location = geocode_address(address, city)
+        geocode_start = time.perf_counter()
+        location = await geocode_address_async(address, city)
+        timing["geocode"] = time.perf_counter() - geocode_start
         if not location:
             raise HTTPException(400, "No se pudo geocodificar la dirección.")
     elif city:
@@ -121,124 +204,279 @@ async def api_sanitize(
 
     try:
         fixed_device_id = int(device_id)
-        fixed_device = DEVICE_PROFILES[fixed_device_id] if 0 <= fixed_device_id < len(DEVICE_PROFILES) else None
-    except (ValueError, IndexError):
-        fixed_device = None
-    use_random = random_device_per_photo == "true"
+        if not 0 <= fixed_device_id < len(DEVICE_PROFILES):
+            fixed_device_id = None
+    except ValueError:
+        fixed_device_id = None
 
     try:
         jitter_r = float(jitter_radius)
     except ValueError:
         jitter_r = 30.0
 
-    zip_buffer = BytesIO()
-    processed = 0
-    errors_list = []
+    try:
+        max_dim = int(max_dimension) if max_dimension else DEFAULT_MAX_DIMENSION
+    except ValueError:
+        max_dim = DEFAULT_MAX_DIMENSION
+
+    # Empty means "server default", so GMB_ENCODER_PROFILE also applies to the web form.
+    if encoder_profile not in ENCODER_PROFILES:
+        encoder_profile = DEFAULT_ENCODER_PROFILE
+
+    try:
+        plan_seed = int(seed) if seed else None
+        if plan_seed is not None and plan_seed < 0:
+            plan_seed = None
+    except ValueError:
+        plan_seed = None
+
+    timing["options"] = time.perf_counter() - start
+    return {
+        "location": location, "city": city, "keyword": keyword.strip(), "intensity": intensity,
+        "date_from": dt_from.isoformat(), "date_to": dt_to.isoformat(), "jitter_radius": jitter_r,
+        "device_id": fixed_device_id, "random_device": random_device_per_photo == "true",
+        "max_dimension": max_dim if max_dim > 0 else None, "seed": plan_seed,
+        "encoder_profile": encoder_profile,
+    }
+
+# Archive formats for /api/sanitize: writer, media type, file extension. Photo
+# entries are stored as-is; JPEG data doesn't shrink under deflate.
+_ARCHIVES = {
+    "zip": (lambda: ZipStream(zipfile.ZIP_STORED), "application/zip", "zip"),
+    "tar": (TarStream, "application/x-tar", "tar"),
+}
 
-    with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zf:
-        for idx, file in enumerate(files):
+def _attachment(filename):
+    ascii_name = filename.encode("ascii", "replace").decode("ascii").replace("?", "_").replace('"', "_")
+    return f"attachment; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(filename)}"
+
+async def _process(engine, upload, job):
+    metrics.BYTES_IN.inc(upload.size)
+    if engine.shares_memory:
+        # Thread workers decode straight from the spooled upload.
+        source = upload.spool
+    else:
+        # Process workers need the bytes pickled over anyway; read them once.
+        read_start = time.perf_counter()
+        source = await asyncio.to_thread(upload.spool.read)
+        metrics.STAGE_SECONDS.observe(time.perf_counter() - read_start, stage="read")
+    return await engine.run(process_photo, source, job)
+
+async def _submit(engine, upload, job, owner):
+    """Start processing an admitted upload once its memory estimate fits the shared budget; returns the task.
+
+    `owner` identifies the request: waiting photos are served round-robin
+    across owners.
+    """
+    estimate = peak_bytes(upload.format, upload.width, upload.height, upload.size, job["max_dimension"])
+    return await get_scheduler().run(owner, estimate, _process, engine, upload, job)
+
+@app.post("/api/sanitize")
+async def api_sanitize(request: Request, files: list[UploadFile] = File(...), opts: dict = Depends(sanitize_options), output: str = Form("zip")):
+    if output not in _ARCHIVES and output != "jpeg":
+        raise HTTPException(400, "Formato de salida inválido (zip, tar o jpeg).")
+    if output == "jpeg" and len(files) != 1:
+        raise HTTPException(400, "La salida jpeg requiere exactamente una foto.")
+    from modules.planner import plan_batch
+    engine = get_engine()
+    uploads = await _admit(files)
+    # Every random choice is made here, up front; workers only apply plan rows.
+    start = time.perf_counter()
+    plan = plan_batch(len(uploads), opts, opts["seed"])
+    timing = {**request.state.server_timing, "plan": time.perf_counter() - start}
+    if output == "jpeg":
+        return await _single_jpeg(engine, uploads[0], plan.row(0), output_name(opts, 0, uploads[0].filename), plan.seed, timing)
+    writer, media_type, extension = _ARCHIVES[output]
+    owner = object()  # this request's queue in the memory scheduler
+
+    async def _archive():
+        archive = writer()
+        processed = 0
+        errors_list = []
+        pending = deque()
+
+        def _collect(name, fname, task, spool):
+            nonlocal processed
+            spool.close()
             try:
-                logger.info(f"[{idx+1}/{len(files)}] Processing: {file.filename} (content_type={file.content_type})")
-                contents = await file.read()
-                logger.info(f"  Read {len(contents)} bytes")
-                if len(contents) == 0:
-                    raise ValueError("Archivo vacío (0 bytes)")
-
-                img = Image.open(BytesIO(contents))
-                logger.info(f"  Opened: mode={img.mode}, size={img.size}")
-                if img.mode != "RGB":
-                    img = img.convert("RGB")
-
-                clean = strip_all_metadata(img)
-                logger.info(f"  Stripped metadata")
-
-                unique, quality_range = uniquify_image(clean, intensity)
-                quality = random.randint(*quality_range)
-                logger.info(f"  Uniquified: size={unique.size}, quality={quality}")
-
-                buf = BytesIO()
-                unique.save(buf, "JPEG", quality=quality, optimize=True)
-                jpeg_bytes = buf.getvalue()
-                logger.info(f"  Saved JPEG: {len(jpeg_bytes)} bytes")
-
-                total_sec = max(1, int((dt_to - dt_from).total_seconds()))
-                ts = dt_from + timedelta(seconds=random.randint(0, total_sec))
-                ts = ts.replace(hour=random.randint(7, 19), minute=random.randint(0, 59), second=random.randint(0, 59))
-                j_lat, j_lon = add_jitter(location["lat"], location["lon"], jitter_r)
-                device = None if use_random or not fixed_device else fixed_device
-
-                exif = build_exif(lat=j_lat, lon=j_lon, altitude=location.get("altitude", 100), timestamp=ts, device_profile=device, image_width=unique.size[0], image_height=unique.size[1], keyword=keyword.strip(), city_name=city)
-                logger.info(f"  Built EXIF")
-
-                final = inject_exif(jpeg_bytes, exif)
-                logger.info(f"  Injected EXIF: {len(final)} bytes")
-
-                # SEO-friendly filename: keyword-city-N.jpg
-                if keyword.strip():
-                    slug = _slugify(keyword.strip())
-                    city_slug = _slugify(city) if city else ""
-                    if city_slug:
-                        fname = f"{slug}-{city_slug}-{idx + 1}.jpg"
-                    else:
-                        fname = f"{slug}-{idx + 1}.jpg"
-                else:
-                    original = os.path.splitext(file.filename or f"photo_{idx}")[0]
-                    fname = f"{original}_gmb.jpg"
-
-                zf.writestr(fname, final)
+                final, allocs, stages = task.result()
+                pack_start = time.perf_counter()
+                chunk = archive.add(fname, final)
+                metrics.observe_stages({**stages, output: time.perf_counter() - pack_start})
+                metrics.PHOTOS.inc(outcome="ok")
+                metrics.BYTES_OUT.inc(len(chunk))
                 processed += 1
-                logger.info(f"  SUCCESS -> {fname}")
+                logger.debug("  SUCCESS -> %s (allocations: %s)", fname, allocs)
+                return chunk
             except Exception as e:
-                err_msg = f"{file.filename}: {str(e)}"
-                logger.error(f"FAILED processing {file.filename}:\n{traceback.format_exc()}")
+                err_msg = f"{name}: {str(e)}"
+                logger.error("FAILED processing %s:\n%s", name, traceback.format_exc())
+                metrics.PHOTOS.inc(outcome="error")
                 errors_list.append(err_msg)
+                return b""
+
+        try:
+            # Photos run on the engine's workers; at most `engine.window` are in flight
+            # and each finished entry is sent in upload order as soon as it is ready.
+            for idx, upload in enumerate(uploads):
+                if upload.error:
+                    # Rejected at admission from its header; never read.
+                    errors_list.append(f"{upload.filename}: {upload.error}")
+                    metrics.PHOTOS.inc(outcome="rejected")
+                    upload.spool.close()
+                    continue
+                logger.debug("[%d/%d] Processing: %s (%s %dx%d, %d bytes)", idx + 1, len(uploads), upload.filename, upload.format, upload.width, upload.height, upload.size)
+                task = await _submit(engine, upload, plan.row(idx), owner)
+                pending.append((upload.filename, output_name(opts, idx, upload.filename), task, upload.spool))
+                while len(pending) >= engine.window:
+                    entry = pending.popleft()
+                    await asyncio.wait([entry[2]])
+                    yield _collect(*entry)
+            while pending:
+                entry = pending.popleft()
+                await asyncio.wait([entry[2]])
+                yield _collect(*entry)
 
-        report = f"Procesadas: {processed}/{len(files)}\n"
-        if errors_list:
-            report += "\nErrores:\n" + "\n".join(errors_list)
-        zf.writestr("_reporte.txt", report)
+            # Counts are only known at the end, after the headers went out; the
+            # report (and, for ZIP, the archive comment) carries them.
+            summary = f"{processed}/{len(uploads)}\n" + "; ".join(errors_list[:3])
+            tail = archive.add("_reporte.txt", _report(processed, len(uploads), errors_list), compression=zipfile.ZIP_DEFLATED) + archive.close(summary.encode("utf-8"))
+            metrics.BYTES_OUT.inc(len(tail))
+            yield tail
+        finally:
+            for _, _, task, _ in pending:
+                task.cancel()
+            for upload in uploads:
+                upload.spool.close()
 
-    zip_buffer.seek(0)
     ts_label = datetime.now().strftime("%Y%m%d_%H%M%S")
-    report_header = f"{processed}/{len(files)} OK"
-    if errors_list:
-        report_header += f" | Errors: {'; '.join(errors_list[:3])}"
-    return StreamingResponse(zip_buffer, media_type="application/zip", headers={
-        "Content-Disposition": f'attachment; filename="gmb_sanitized_{ts_label}.zip"',
-        "X-GMB-Processed": str(processed),
-        "X-GMB-Total": str(len(files)),
-        "X-GMB-Errors": "; ".join(errors_list[:3]) if errors_list else "",
+    return StreamingResponse(_archive(), media_type=media_type, headers={
+        "Content-Disposition": f'attachment; filename="gmb_sanitized_{ts_label}.{extension}"',
+        "X-GMB-Total": str(len(uploads)),
+        "X-GMB-Seed": str(plan.seed),
+        # Only the stages before the first byte; per-photo stages are in /metrics.
+        "Server-Timing": metrics.server_timing(timing),
     })
 
-@app.post("/api/verify")
-async def api_verify(file: UploadFile = File(...)):
-    import piexif
-    contents = await file.read()
+async def _single_jpeg(engine, upload, job, fname, seed, timing):
+    """One photo in, the JPEG itself out; the counts go in the X-GMB headers."""
+    headers = {"X-GMB-Total": "1", "X-GMB-Seed": str(seed)}
     try:
-        exif_dict = piexif.load(contents)
-    except Exception:
-        return JSONResponse({"error": "No se pudo leer EXIF"})
-    result = {}
-    for ifd_name in ("0th", "Exif", "GPS", "1st"):
-        ifd = exif_dict.get(ifd_name, {})
-        if isinstance(ifd, dict):
-            readable = {}
-            for tag, val in ifd.items():
-                try:
-                    tag_name = piexif.TAGS.get(ifd_name, {}).get(tag, {}).get("name", str(tag))
-                except Exception:
-                    tag_name = str(tag)
-                if isinstance(val, bytes):
-                    try:
-                        val = val.decode("utf-8", errors="replace")
-                    except Exception:
-                        val = str(val)
-                elif isinstance(val, tuple):
-                    val = str(val)
-                readable[tag_name] = val
-            if readable:
-                result[ifd_name] = readable
-    return JSONResponse(result)
+        if upload.error:
+            metrics.PHOTOS.inc(outcome="rejected")
+            error = upload.error
+        else:
+            try:
+                final, allocs, stages = await (await _submit(engine, upload, job, object()))
+            except Exception as e:
+                logger.error("FAILED processing %s:\n%s", upload.filename, traceback.format_exc())
+                metrics.PHOTOS.inc(outcome="error")
+                error = str(e)
+            else:
+                metrics.observe_stages(stages)
+                metrics.PHOTOS.inc(outcome="ok")
+                metrics.BYTES_OUT.inc(len(final))
+                # The whole photo is done before the headers go out, so every stage fits in Server-Timing.
+                headers.update({
+                    "Content-Disposition": _attachment(fname),
+                    "X-GMB-Processed": "1",
+                    "X-GMB-Errors": "",
+                    "Server-Timing": metrics.server_timing({**timing, **stages}),
+                })
+                return Response(final, media_type="image/jpeg", headers=headers)
+    finally:
+        upload.spool.close()
+    headers.update({"X-GMB-Processed": "0", "X-GMB-Errors": quote(f"{upload.filename}: {error}"), "Server-Timing": metrics.server_timing(timing)})
+    return JSONResponse({"detail": f"{upload.filename}: {error}"}, status_code=422, headers=headers)
+
+@app.post("/api/jobs", status_code=202)
+async def api_jobs_create(files: list[UploadFile] = File(...), opts: dict = Depends(sanitize_options)):
+    from modules.planner import new_seed
+    runner = get_job_runner()
+    # Pin the seed so a job resumed after a restart replays the same plan.
+    opts = {**opts, "seed": opts["seed"] if opts["seed"] is not None else new_seed()}
+    uploads = await _admit(files)
+    try:
+        job_id = await asyncio.to_thread(runner.store.create, opts, [(u.filename, u.spool, u.error) for u in uploads])
+    finally:
+        for u in uploads:
+            u.spool.close()
+    runner.start()
+    return JSONResponse({"id": job_id, "status": "queued", "total": len(files), "seed": str(opts["seed"])}, status_code=202)
+
+def _get_job(job_id):
+    job = get_job_runner().store.get(job_id)
+    if not job:
+        raise HTTPException(404, "Trabajo no encontrado.")
+    return job
+
+@app.get("/api/jobs/{job_id}")
+async def api_jobs_status(job_id: str):
+    job = _get_job(job_id)
+    files = job["files"]
+    return JSONResponse({
+        "id": job["id"],
+        "status": job["status"],
+        "total": len(files),
+        "processed": sum(f["status"] == "done" for f in files),
+        "errors": sum(f["status"] == "error" for f in files),
+        "files": [{"name": f["filename"], "output": f["output"], "status": f["status"], "error": f["error"]} for f in files],
+    })
+
+@app.get("/api/jobs/{job_id}/result")
+async def api_jobs_result(job_id: str):
+    job = _get_job(job_id)
+    if job["status"] not in ("done", "failed"):
+        raise HTTPException(409, "El trabajo aún no ha terminado.")
+    store = get_job_runner().store
+    done = [f for f in job["files"] if f["status"] == "done"]
+    errors_list = [f["error"] for f in job["files"] if f["status"] != "done"]
+
+    async def _archive():
+        archive = ZipStream(zipfile.ZIP_STORED)
+        for f in done:
+            data = await asyncio.to_thread(store.output_path(job_id, f["idx"]).read_bytes)
+            yield archive.add(f["output"], data)
+        yield archive.add("_reporte.txt", _report(len(done), len(job["files"]), errors_list), compression=zipfile.ZIP_DEFLATED)
+        yield archive.close()
+
+    return StreamingResponse(_archive(), media_type="application/zip", headers={
+        "Content-Disposition": f'attachment; filename="gmb_sanitized_{job_id[:8]}.zip"',
+        "X-GMB-Processed": str(len(done)),
+        "X-GMB-Total": str(len(job["files"])),
+        "X-GMB-Errors": quote("; ".join(e or "" for e in errors_list[:3])),
+    })
+
+@app.post("/api/verify")
+async def api_verify(file: Optional[UploadFile] = File(None), files: list[UploadFile] = File([])):
+    from modules import verifier
+    if file is not None and not files:
+        try:
+            return JSONResponse(await asyncio.to_thread(verifier.verify, file.file))
+        except Exception:
+            return JSONResponse({"error": "No se pudo leer EXIF"})
+    if not files:
+        raise HTTPException(400, "Envía una foto en 'file' o varias (o un ZIP) en 'files'.")
+
+    # Headers first (a few KB per photo, straight from the spooled uploads),
+    # then the parsing, split in one chunk per worker.
+    items = []
+    for upload in files + ([file] if file else []):
+        items += await asyncio.to_thread(verifier.collect, upload.filename or "foto.jpg", upload.file)
+    results = [{"name": name, "exif": False, "error": error} if error else None for name, _, error in items]
+    todo = [i for i, (_, _, error) in enumerate(items) if not error]
+    engine = get_engine()
+    size = -(-len(todo) // engine.workers) or 1
+    batches = [todo[i:i + size] for i in range(0, len(todo), size)]
+    chunks = await asyncio.gather(*(engine.run(verifier.summarize_many, [items[i][:2] for i in batch]) for batch in batches))
+    for batch, chunk in zip(batches, chunks):
+        for i, summary in zip(batch, chunk):
+            results[i] = summary
+    return JSONResponse({
+        "total": len(results),
+        "with_exif": sum(1 for s in results if s["exif"]),
+        "files": results,
+    })
 
 if __name__ == "__main__":
     import uvicorn
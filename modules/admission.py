@@ -0,0 +1,164 @@
+"""
+ADMISSION — Reparte un presupuesto de memoria entre las fotos en proceso de todas las peticiones y trabajos.
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from modules.metrics import Callback, Histogram
+
+# Peak bytes per pixel while a photo is processed, measured on 12-24 MP
+# photos (26-28 B/px of the full frame): the decoded frame and its stripped
+# copy (4 B/px each) live through uniquify; at output size the geometry
+# result (4), the uint8 array (3), the float32 kernel buffer (12), the
+# result (3) and the sharpen copies overlap.
+_DECODED_BYTES_PER_PX = 8
+_OUTPUT_BYTES_PER_PX = 20
+# Frames the uniquifier tiles keep only the geometry frame at full size
+# (4 B/px) plus one strip's buffers (~26 B/px of a strip, at most ~110 MB).
+_TILED_OUTPUT_BYTES_PER_PX = 4
+_TILED_STRIP_BYTES = 110 << 20
+
+def _default_budget():
+    # Half the container's memory limit (cgroup v2), else half the machine's RAM.
+    try:
+        with open("/sys/fs/cgroup/memory.max") as f:
+            limit = int(f.read().strip())
+    except (OSError, ValueError):
+        try:
+            limit = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+        except (ValueError, OSError, AttributeError):
+            limit = 4 << 30
+    return limit // 2
+
+MEMORY_BUDGET = int(os.environ.get("GMB_MEMORY_BUDGET", "0") or 0) or _default_budget()
+
+def peak_bytes(fmt, width, height, file_size, max_dimension=None):
+    """Estimated peak memory of process_photo for a photo of these header dimensions.
+
+    With max_dimension set, JPEGs are decoded at 1/2, 1/4 or 1/8 scale (the
+    same draft choice the pipeline makes) and everything after the geometry
+    step works at the output size, in strips above the uniquifier's
+    TILE_PIXELS. The encoded input counts twice: it is pickled over to the
+    worker.
+    """
+    longest = max(width, height)
+    scale = max_dimension / longest if max_dimension and longest > max_dimension else 1.0
+    draft = 1
+    if fmt == "JPEG":
+        while draft < 8 and longest / (draft * 2) >= longest * scale:
+            draft *= 2
+    decoded = (width // draft) * (height // draft)
+    output = width * height * scale * scale
+    from modules.uniquifier import TILE_PIXELS  # NumPy is loaded anyway once photos are planned
+    if TILE_PIXELS and output > TILE_PIXELS:
+        working = _TILED_OUTPUT_BYTES_PER_PX * output + _TILED_STRIP_BYTES
+    else:
+        working = _OUTPUT_BYTES_PER_PX * output
+    return int(_DECODED_BYTES_PER_PX * decoded + working + 2 * file_size)
+
+class MemoryScheduler:
+    """Admits photos while their estimated peaks fit in `budget` bytes.
+
+    Waiting photos queue per owner (a request or a job) and owners are
+    served round-robin, so a 500-photo batch can't hold back a single photo
+    sent alongside it. The head of the line waits for room even when a
+    smaller photo behind it would fit, so big photos aren't starved; one
+    bigger than the whole budget runs alone. Lives on the event loop: all
+    methods must be called from it.
+    """
+
+    def __init__(self, budget=MEMORY_BUDGET):
+        self.budget = budget
+        self.admitted = 0
+        self.running = 0
+        self._queues = OrderedDict()
+
+    @property
+    def waiting(self):
+        return sum(len(q) for q in self._queues.values())
+
+    async def acquire(self, owner, nbytes):
+        """Wait until `nbytes` fit; returns the amount to pass to release()."""
+        nbytes = min(int(nbytes), self.budget)
+        if not self._queues and self._fits(nbytes):
+            self._grant(nbytes)
+            return nbytes
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(owner, deque()).append((waiter, nbytes))
+        start = time.perf_counter()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release(nbytes)  # admitted in the same tick the caller went away
+            else:
+                self._discard(owner, waiter)
+            raise
+        ADMISSION_WAIT_SECONDS.observe(time.perf_counter() - start)
+        return nbytes
+
+    def release(self, nbytes):
+        self.admitted -= nbytes
+        self.running -= 1
+        self._wake()
+
+    def _fits(self, nbytes):
+        return self.running == 0 or self.admitted + nbytes <= self.budget
+
+    def _grant(self, nbytes):
+        self.admitted += nbytes
+        self.running += 1
+
+    def _discard(self, owner, waiter):
+        queue = self._queues.get(owner)
+        if queue is None:
+            return
+        for entry in queue:
+            if entry[0] is waiter:
+                queue.remove(entry)
+                break
+        if not queue:
+            del self._queues[owner]
+        self._wake()
+
+    def _wake(self):
+        while self._queues:
+            owner, queue = next(iter(self._queues.items()))
+            waiter, nbytes = queue[0]
+            if not waiter.done() and not self._fits(nbytes):
+                return
+            queue.popleft()
+            # This owner goes to the back of the line.
+            del self._queues[owner]
+            if queue:
+                self._queues[owner] = queue
+            if waiter.done():
+                continue  # cancelled; acquire() is about to discard it
+            self._grant(nbytes)
+            waiter.set_result(None)
+
+    async def run(self, owner, nbytes, coro_fn, *args):
+        """Start `coro_fn(*args)` once admitted; returns its task, which frees the memory when done."""
+        granted = await self.acquire(owner, nbytes)
+        try:
+            task = asyncio.ensure_future(coro_fn(*args))
+        except BaseException:
+            self.release(granted)
+            raise
+        task.add_done_callback(lambda _: self.release(granted))
+        return task
+
+_scheduler = None
+
+def get_scheduler():
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = MemoryScheduler()
+    return _scheduler
+
+ADMISSION_WAIT_SECONDS = Histogram("gmb_admission_wait_seconds", "Time photos waited for memory before being processed.")
+Callback("gmb_admission_queue_depth", "Photos waiting for memory, across all requests and jobs.", lambda: get_scheduler().waiting)
+Callback("gmb_admission_admitted_bytes", "Estimated peak bytes of the photos being processed.", lambda: get_scheduler().admitted)
+Callback("gmb_admission_running", "Photos admitted and being processed.", lambda: get_scheduler().running)
+Callback("gmb_admission_budget_bytes", "Memory budget shared by all photos being processed.", lambda: get_scheduler().budget)
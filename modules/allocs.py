@@ -0,0 +1,33 @@
+"""
+ALLOCS — Contabiliza los bytes de buffers de imagen que reserva cada etapa por foto.
+"""
+
+def image_nbytes(img):
+    # Pillow keeps 1-band images at one byte per pixel and everything else at four.
+    return img.width * img.height * (1 if img.mode in ("1", "L", "P") else 4)
+
+class AllocCounter:
+    """Per-photo tally of frame-sized allocations, keyed by pipeline stage.
+
+    Stages record what they allocate (decoded images, NumPy buffers, encoded
+    bytes); the totals travel back with the result so regressions show up in
+    the logs and in benchmarks/bench_alloc.py.
+    """
+
+    def __init__(self):
+        self.stages = {}
+
+    def add(self, stage, nbytes):
+        self.stages[stage] = self.stages.get(stage, 0) + int(nbytes)
+
+    def image(self, stage, img):
+        self.add(stage, image_nbytes(img))
+        return img
+
+    def array(self, stage, arr):
+        self.add(stage, arr.nbytes)
+        return arr
+
+    @property
+    def total(self):
+        return sum(self.stages.values())
@@ -0,0 +1,100 @@
+"""
+ENGINE — Reparte el trabajo por foto entre varios núcleos sin bloquear el event loop.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger("gmb-sanitizer")
+
+def _default_workers():
+    try:
+        return max(1, int(os.environ.get("GMB_WORKERS", "0")) or os.cpu_count() or 1)
+    except ValueError:
+        return os.cpu_count() or 1
+
+def _init_worker():
+    logging.basicConfig(level=logging.INFO)
+
+class Engine:
+    """Executor wrapper used by the request handlers.
+
+    `kind` is "process" (default) or "thread". Process pools are not available
+    everywhere (e.g. serverless sandboxes without /dev/shm), so creating one
+    falls back to a thread pool of the same size.
+    """
+
+    def __init__(self, workers=None, kind=None):
+        self.workers = workers or _default_workers()
+        self.kind = kind or os.environ.get("GMB_ENGINE", "process")
+        self._executor = None
+
+    def _create(self):
+        if self.kind == "process":
+            try:
+                ctx = multiprocessing.get_context("spawn")
+                return ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx, initializer=_init_worker)
+            except (OSError, NotImplementedError, ImportError) as e:
+                logger.warning(f"Process pool unavailable ({e}), falling back to threads")
+                self.kind = "thread"
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="gmb-worker")
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = self._create()
+            logger.info(f"Engine started: {self.kind} pool with {self.workers} workers")
+        return self._executor
+
+    async def run(self, fn, *args):
+        """Run fn(*args) on a worker.
+
+        Cancelling drops work no worker has picked up yet. Work already
+        running can't be stopped, so the call only ends once it is over:
+        callers such as the memory scheduler then release its memory when
+        it is actually free, not when the caller went away.
+        """
+        future = self.executor.submit(fn, *args)
+        waiter = asyncio.wrap_future(future)
+        try:
+            return await asyncio.shield(waiter)
+        except asyncio.CancelledError:
+            future.cancel()
+            while not waiter.done():
+                try:
+                    await asyncio.wait([waiter])
+                except asyncio.CancelledError:
+                    pass
+            if not waiter.cancelled():
+                waiter.exception()  # nobody is left to see it
+            raise
+        except BrokenProcessPool:
+            # A worker died (usually OOM); drop the pool so the next photo gets a fresh one.
+            self.shutdown(wait=False)
+            raise
+
+    @property
+    def shares_memory(self):
+        """True when workers are threads, so open files can be handed over as-is."""
+        return isinstance(self.executor, ThreadPoolExecutor)
+
+    @property
+    def window(self):
+        """How many photos to keep in flight at once per request."""
+        return self.workers * 2
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=not wait)
+            self._executor = None
+
+_engine = None
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        _engine = Engine()
+    return _engine
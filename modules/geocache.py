@@ -0,0 +1,76 @@
+"""
+GEOCACHE — Caché LRU + TTL de geocodificación, con persistencia opcional en SQLite.
+"""
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+MISS = object()
+
+def normalize_query(address, city=""):
+    """Cache key for an address: accent- and case-folded, punctuation and
+    whitespace collapsed, qualified by the (equally normalized) city."""
+    def fold(text):
+        text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode("ascii").casefold()
+        return " ".join(re.sub(r"[^a-z0-9#]+", " ", text).split())
+    return f"{fold(address)}|{fold(city)}"
+
+class GeoCache:
+    """Thread-safe LRU cache with per-entry expiry.
+
+    A value of None is a negative result ("the geocoder found nothing") and
+    expires after `negative_ttl` instead of `ttl`. With `path`, entries are
+    written through to a SQLite table and read back on memory misses, so the
+    cache survives restarts.
+    """
+
+    def __init__(self, maxsize=1024, ttl=30 * 86400, negative_ttl=3600, path=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("CREATE TABLE IF NOT EXISTS geocache (key TEXT PRIMARY KEY, value TEXT, expires REAL NOT NULL)")
+            self._db.execute("DELETE FROM geocache WHERE expires < ?", (time.time(),))
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None and self._db is not None:
+                row = self._db.execute("SELECT value, expires FROM geocache WHERE key = ?", (key,)).fetchone()
+                if row:
+                    entry = (json.loads(row[0]) if row[0] is not None else None, row[1])
+                    self._store(key, entry)
+            if entry is None or entry[1] < now:
+                self.misses += 1
+                return MISS
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        entry = (value, time.time() + (self.ttl if value is not None else self.negative_ttl))
+        with self._lock:
+            self._store(key, entry)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO geocache (key, value, expires) VALUES (?, ?, ?)", (key, json.dumps(value) if value is not None else None, entry[1]))
+
+    def _store(self, key, entry):
+        self._data[key] = entry
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._data)}
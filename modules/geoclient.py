@@ -0,0 +1,140 @@
+"""
+GEOCLIENT — Cliente asíncrono de geocodificación: pool de conexiones, límite de tasa y coalescencia.
+"""
+import asyncio
+import os
+import time
+from modules.geocache import MISS, normalize_query
+from modules.metrics import GEOCODE_UPSTREAM_SECONDS
+
+NOMINATIM_URL = os.environ.get("GMB_NOMINATIM_URL", "https://nominatim.openstreetmap.org")
+USER_AGENT = "GMBSanitizer/1.0"
+
+def nominatim_query(address, city=""):
+    query = address
+    if city:
+        query += f", {city}"
+    return query + ", Colombia"
+
+def parse_point(results):
+    if not results:
+        return None
+    return {"lat": float(results[0]["lat"]), "lon": float(results[0]["lon"])}
+
+class TokenBucket:
+    """Async rate limiter: `rate` tokens per second, at most `burst` saved up.
+
+    Waiters queue on a lock, so requests go upstream in arrival order.
+    """
+
+    def __init__(self, rate=1.0, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = None
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            if self._last is not None:
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._last = loop.time()
+                self._tokens = 1.0
+            self._tokens -= 1
+
+class NominatimBackend:
+    """Nominatim /search over a shared httpx connection pool.
+
+    `base_url` can point at any server speaking the same API (a self-hosted
+    Nominatim, or a local stand-in during tests).
+    """
+
+    def __init__(self, base_url=NOMINATIM_URL, timeout=10.0, max_connections=4):
+        import httpx  # ~0.2 s to import; only paid once a geocode actually goes upstream
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            headers={"User-Agent": USER_AGENT},
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    async def search(self, address, city=""):
+        resp = await self._client.get("/search", params={"q": nominatim_query(address, city), "format": "json", "limit": 1, "countrycodes": "co"})
+        resp.raise_for_status()
+        return parse_point(resp.json())
+
+    async def aclose(self):
+        await self._client.aclose()
+
+class GeoClient:
+    """Cache-aware front for a geocoding backend.
+
+    Concurrent calls for the same normalized query share one upstream
+    request; distinct queries go out no faster than the rate limiter allows
+    (Nominatim's usage policy is 1 request per second).
+    """
+
+    def __init__(self, cache, backend=None, limiter=None):
+        self.cache = cache
+        self.backend = backend or NominatimBackend()
+        self.limiter = limiter or TokenBucket(float(os.environ.get("GMB_NOMINATIM_RATE", "1")))
+        self._inflight = {}
+
+    async def search(self, address, city=""):
+        """{"lat", "lon"} or None; raises when the backend fails."""
+        key = normalize_query(address, city)
+        point = self.cache.get(key)
+        if point is not MISS:
+            return point
+        task = self._inflight.get(key)
+        if task is None:
+            # The upstream request is its own task and every caller, the first
+            # one included, only shields it: a caller going away cancels its
+            # own wait, never the request the others are waiting on.
+            task = self._inflight[key] = asyncio.create_task(self._fetch(key, address, city))
+            task.add_done_callback(lambda t: self._done(key, t))
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key, address, city):
+        await self.limiter.acquire()
+        start = time.perf_counter()
+        try:
+            point = await self.backend.search(address, city)
+        except Exception:
+            GEOCODE_UPSTREAM_SECONDS.observe(time.perf_counter() - start, outcome="error")
+            raise
+        GEOCODE_UPSTREAM_SECONDS.observe(time.perf_counter() - start, outcome="ok")
+        self.cache.put(key, point)
+        return point
+
+    def _done(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved: every caller may have gone away already
+
+    async def aclose(self):
+        for task in list(self._inflight.values()):
+            task.cancel()
+        await self.backend.aclose()
+
+_clients = {}
+
+def get_geo_client(cache):
+    # httpx pools and asyncio locks belong to one event loop; keep a client per loop.
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        _clients.clear()
+        client = _clients[loop] = GeoClient(cache)
+    return client
+
+async def close_geo_clients():
+    for client in list(_clients.values()):
+        await client.aclose()
+    _clients.clear()
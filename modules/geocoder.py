@@ -1,40 +1,78 @@
 """
 GEOCODER — Convierte direcciones/ciudades colombianas a coordenadas GPS.
 """
+import os
 import random
-import requests
+import time
+from functools import lru_cache
 from data.colombia import CITIES
+from modules.cityindex import CityIndex
+from modules.geocache import MISS, GeoCache, normalize_query
+from modules.geoclient import NOMINATIM_URL, USER_AGENT, get_geo_client, nominatim_query, parse_point
+from modules.metrics import GEOCODE_UPSTREAM_SECONDS, Callback
+
+@lru_cache(maxsize=1)
+def _city_index():
+    return CityIndex(CITIES)
+
+# Repeated addresses are answered from here; set GMB_GEOCACHE_PATH to keep them across restarts.
+_cache = GeoCache(
+    maxsize=int(os.environ.get("GMB_GEOCACHE_SIZE", "4096")),
+    ttl=float(os.environ.get("GMB_GEOCACHE_TTL", str(30 * 86400))),
+    negative_ttl=float(os.environ.get("GMB_GEOCACHE_NEGATIVE_TTL", "3600")),
+    path=os.environ.get("GMB_GEOCACHE_PATH") or None,
+)
+Callback("gmb_geocache_hits_total", "Geocode lookups answered from the cache.", lambda: _cache.hits, kind="counter")
+Callback("gmb_geocache_misses_total", "Geocode lookups the cache could not answer.", lambda: _cache.misses, kind="counter")
+Callback("gmb_geocache_entries", "Entries held in the in-memory geocode cache.", lambda: _cache.stats()["size"])
 
 def geocode_city(city_name):
-    if city_name in CITIES:
-        c = CITIES[city_name]
-        return {"lat": c["lat"], "lon": c["lon"], "altitude": c["altitude"], "department": c["department"], "postal_code": random.choice(c["postal_codes"]), "source": "local_db"}
-    for name, c in CITIES.items():
-        if name.lower() == city_name.strip().lower():
-            return {"lat": c["lat"], "lon": c["lon"], "altitude": c["altitude"], "department": c["department"], "postal_code": random.choice(c["postal_codes"]), "source": "local_db"}
-    for name, c in CITIES.items():
-        if city_name.strip().lower() in name.lower():
-            return {"lat": c["lat"], "lon": c["lon"], "altitude": c["altitude"], "department": c["department"], "postal_code": random.choice(c["postal_codes"]), "source": "local_db"}
-    return None
+    name = _city_index().lookup(city_name)
+    if name is None:
+        return None
+    c = CITIES[name]
+    return {"lat": c["lat"], "lon": c["lon"], "altitude": c["altitude"], "department": c["department"], "postal_code": random.choice(c["postal_codes"]), "source": "local_db"}
 
-def geocode_address(address, city=""):
+def _nominatim_search(address, city=""):
+    """Ask Nominatim for `address`; {"lat", "lon"} or None when nothing matches.
+
+    Network errors and non-200 answers raise, so they are never cached.
+    """
+    import requests
+    start = time.perf_counter()
+    outcome = "error"
     try:
-        query = address
-        if city:
-            query += f", {city}"
-        query += ", Colombia"
-        resp = requests.get("https://nominatim.openstreetmap.org/search", params={"q": query, "format": "json", "limit": 1, "countrycodes": "co"}, headers={"User-Agent": "GMBSanitizer/1.0"}, timeout=10)
-        if resp.status_code == 200 and resp.json():
-            r = resp.json()[0]
-            lat, lon = float(r["lat"]), float(r["lon"])
-            city_data = geocode_city(city) if city else None
-            return {"lat": lat, "lon": lon, "altitude": city_data["altitude"] if city_data else 100, "department": city_data["department"] if city_data else "", "postal_code": city_data["postal_code"] if city_data else "110111", "source": "nominatim"}
-    except Exception:
-        pass
+        resp = requests.get(f"{NOMINATIM_URL}/search", params={"q": nominatim_query(address, city), "format": "json", "limit": 1, "countrycodes": "co"}, headers={"User-Agent": USER_AGENT}, timeout=10)
+        resp.raise_for_status()
+        point = parse_point(resp.json())
+        outcome = "ok"
+        return point
+    finally:
+        GEOCODE_UPSTREAM_SECONDS.observe(time.perf_counter() - start, outcome=outcome)
+
+def _address_result(point, city):
+    if point:
+        city_data = geocode_city(city) if city else None
+        return {"lat": point["lat"], "lon": point["lon"], "altitude": city_data["altitude"] if city_data else 100, "department": city_data["department"] if city_data else "", "postal_code": city_data["postal_code"] if city_data else "110111", "source": "nominatim"}
     if city:
         return geocode_city(city)
     return None
 
-def add_jitter(lat, lon, radius_m=30.0):
-    offset = radius_m / 111_000
-    return (lat + random.uniform(-offset, offset), lon + random.uniform(-offset, offset))
+def geocode_address(address, city=""):
+    key = normalize_query(address, city)
+    point = _cache.get(key)
+    if point is MISS:
+        try:
+            point = _nominatim_search(address, city)
+            _cache.put(key, point)
+        except Exception:
+            point = None
+    return _address_result(point, city)
+
+async def geocode_address_async(address, city=""):
+    """Non-blocking geocode_address for request handlers (pooled, rate-limited, coalesced)."""
+    try:
+        point = await get_geo_client(_cache).search(address, city)
+    except Exception:
+        point = None
+    return _address_result(point, city)
@@ -0,0 +1,132 @@
+"""
+INGEST — Admisión de subidas: formato y dimensiones desde la cabecera, límites por archivo y por petición.
+"""
+import os
+import struct
+
+# Per-file limits fit 200 MP photos and panoramas (a bit over, for odd
+# aspect ratios); past TILE_PIXELS the uniquifier works on them in strips.
+MAX_FILE_BYTES = int(os.environ.get("GMB_MAX_FILE_BYTES", str(150 << 20)))
+MAX_REQUEST_BYTES = int(os.environ.get("GMB_MAX_REQUEST_BYTES", str(500 << 20)))
+MAX_FILE_MEGAPIXELS = float(os.environ.get("GMB_MAX_FILE_MEGAPIXELS", "250"))
+MAX_REQUEST_MEGAPIXELS = float(os.environ.get("GMB_MAX_REQUEST_MEGAPIXELS", "1500"))
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Start-of-frame markers carry the frame size; C4 (DHT), C8 (JPG) and CC (DAC) don't.
+_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+class RejectedUpload(ValueError):
+    """One file can't be processed; the rest of the request goes on."""
+
+class RequestTooLarge(ValueError):
+    """The request as a whole is over a limit; nothing is processed."""
+
+def _jpeg_size(f):
+    # Walk segment headers only, seeking over payloads (EXIF thumbnails, ICC
+    # profiles), until the SOF; only a few bytes per segment are read.
+    f.seek(2)
+    while True:
+        byte = f.read(1)
+        if byte != b"\xff":
+            raise RejectedUpload("JPEG truncado o corrupto: no se encontró el encabezado SOF")
+        marker = f.read(1)
+        while marker == b"\xff":
+            marker = f.read(1)
+        if not marker:
+            raise RejectedUpload("JPEG truncado: no se encontró el encabezado SOF")
+        m = marker[0]
+        if m == 0x01 or 0xD0 <= m <= 0xD8:
+            continue
+        if m in (0xD9, 0xDA):
+            raise RejectedUpload("JPEG sin encabezado SOF")
+        header = f.read(2)
+        if len(header) < 2:
+            raise RejectedUpload("JPEG truncado")
+        length = struct.unpack(">H", header)[0]
+        if m in _SOF_MARKERS:
+            frame = f.read(5)
+            if len(frame) < 5:
+                raise RejectedUpload("JPEG truncado")
+            _, height, width = struct.unpack(">BHH", frame)
+            return width, height
+        f.seek(length - 2, 1)
+
+def probe(fileobj):
+    """(format, width, height) read from the file's header; leaves it rewound.
+
+    JPEG and PNG are parsed here (SOF / IHDR); anything else goes through
+    Image.open, which also stops after the header.
+    """
+    fileobj.seek(0)
+    head = fileobj.read(24)
+    try:
+        if head[:3] == b"\xff\xd8\xff":
+            fmt, (width, height) = "JPEG", _jpeg_size(fileobj)
+        elif head[:8] == _PNG_SIGNATURE and head[12:16] == b"IHDR":
+            fmt, (width, height) = "PNG", struct.unpack(">II", head[16:24])
+        else:
+            from PIL import Image
+            fileobj.seek(0)
+            try:
+                with Image.open(fileobj) as img:
+                    fmt, (width, height) = img.format, img.size
+            except Exception:
+                raise RejectedUpload("Formato de imagen no reconocido")
+    finally:
+        fileobj.seek(0)
+    if width == 0 or height == 0:
+        raise RejectedUpload("Dimensiones de imagen inválidas")
+    return fmt, width, height
+
+def _size(fileobj):
+    fileobj.seek(0, os.SEEK_END)
+    size = fileobj.tell()
+    fileobj.seek(0)
+    return size
+
+class Upload:
+    """A received file plus what admission learned about it.
+
+    `error` is set when the file was rejected; its contents are never read.
+    """
+
+    def __init__(self, filename, content_type, spool):
+        self.filename = filename
+        self.content_type = content_type
+        self.spool = spool
+        self.size = _size(spool)
+        self.format = None
+        self.width = self.height = 0
+        self.error = None
+
+    @property
+    def megapixels(self):
+        return self.width * self.height / 1e6
+
+def admit(files):
+    """Check every (filename, content_type, spool) against the limits.
+
+    Files that are empty, over the per-file limits or not an image come back
+    with `error` set. Raises RequestTooLarge when the accepted files together
+    go over the per-request byte or megapixel budget.
+    """
+    uploads = [Upload(*f) for f in files]
+    for u in uploads:
+        try:
+            if u.size == 0:
+                raise RejectedUpload("Archivo vacío (0 bytes)")
+            if u.size > MAX_FILE_BYTES:
+                raise RejectedUpload(f"Archivo demasiado grande ({u.size / (1 << 20):.1f} MB; máximo {MAX_FILE_BYTES / (1 << 20):g} MB)")
+            u.format, u.width, u.height = probe(u.spool)
+            if u.megapixels > MAX_FILE_MEGAPIXELS:
+                raise RejectedUpload(f"Imagen demasiado grande ({u.megapixels:.0f} MP; máximo {MAX_FILE_MEGAPIXELS:g} MP)")
+        except RejectedUpload as e:
+            u.error = str(e)
+    accepted = [u for u in uploads if u.error is None]
+    total_bytes = sum(u.size for u in accepted)
+    if total_bytes > MAX_REQUEST_BYTES:
+        raise RequestTooLarge(f"La petición supera el límite de {MAX_REQUEST_BYTES / (1 << 20):g} MB ({total_bytes / (1 << 20):.0f} MB).")
+    total_mp = sum(u.megapixels for u in accepted)
+    if total_mp > MAX_REQUEST_MEGAPIXELS:
+        raise RequestTooLarge(f"La petición supera el límite de {MAX_REQUEST_MEGAPIXELS:g} MP ({total_mp:.0f} MP).")
+    return uploads
@@ -2,12 +2,9 @@
 INJECTOR — Construye e inyecta EXIF realista en JPEGs.
 """
 import random
-import tempfile
-import os
+import struct
 from datetime import datetime, timedelta
-from io import BytesIO
 import piexif
-from PIL import Image
 from data.colombia import DEVICE_PROFILES
 
 def _decimal_to_dms(decimal_degrees: float):
@@ -18,7 +15,16 @@ def _decimal_to_dms(decimal_degrees: float):
     s_float = (m_float - minutes) * 60
     return ((degrees, 1), (minutes, 1), (int(s_float * 10000), 10000))
 
-def build_exif(lat, lon, altitude, timestamp=None, device_profile=None, image_width=None, image_height=None, keyword="", city_name=""):
+def device_choices(device_profile):
+    """ISO values and exposure denominators a device profile can report."""
+    iso_lo, iso_hi = device_profile["iso_range"]
+    iso_options = [v for v in [50,64,80,100,125,160,200,250,320,400,500,640,800] if iso_lo <= v <= iso_hi]
+    exp_options = [v for v in [60,100,120,125,160,200,250,320,500,1000,2000,4000] if v <= device_profile["exposure_range"][1]]
+    return iso_options, exp_options
+
+def _draw_fields(lat, lon, altitude, timestamp, device_profile, image_width, image_height, subsec=None, iso=None, exp_denom=None):
+    """Per-photo random draws, in the order build_exif has always made them.
+    Values already planned by the caller are used as given."""
     if device_profile is None:
         device_profile = random.choice(DEVICE_PROFILES)
     if timestamp is None:
@@ -27,37 +33,50 @@ def build_exif(lat, lon, altitude, timestamp=None, device_profile=None, image_wi
         timestamp = now - timedelta(seconds=offset)
         timestamp = timestamp.replace(hour=random.randint(7, 19), minute=random.randint(0, 59), second=random.randint(0, 59))
 
-    dt_str = timestamp.strftime("%Y:%m:%d %H:%M:%S")
-    subsec = str(random.randint(100, 999))
-    lat_ref = b"N" if lat >= 0 else b"S"
-    lon_ref = b"E" if lon >= 0 else b"W"
-    lat_dms = _decimal_to_dms(lat)
-    lon_dms = _decimal_to_dms(lon)
-    alt_ref = 0 if altitude >= 0 else 1
-    alt_val = (int(abs(altitude) * 100), 100)
-
-    iso_lo, iso_hi = device_profile["iso_range"]
-    iso_options = [v for v in [50,64,80,100,125,160,200,250,320,400,500,640,800] if iso_lo <= v <= iso_hi]
-    iso = random.choice(iso_options) if iso_options else 200
-    exp_options = [v for v in [60,100,120,125,160,200,250,320,500,1000,2000,4000] if v <= device_profile["exposure_range"][1]]
-    exp_denom = random.choice(exp_options) if exp_options else 125
+    iso_options, exp_options = device_choices(device_profile)
+    if subsec is None:
+        subsec = str(random.randint(100, 999))
+    if iso is None:
+        iso = random.choice(iso_options) if iso_options else 200
+    if exp_denom is None:
+        exp_denom = random.choice(exp_options) if exp_options else 125
     px = image_width or device_profile["pixel_x"]
     py = image_height or device_profile["pixel_y"]
+    return device_profile, _photo_tags(lat, lon, altitude, timestamp, subsec, iso, exp_denom, px, py)
+
+def _photo_tags(lat, lon, altitude, timestamp, subsec, iso, exp_denom, px, py):
+    """The tags that change from photo to photo, keyed by (ifd, tag)."""
+    dt_str = timestamp.strftime("%Y:%m:%d %H:%M:%S").encode()
+    return {
+        ("0th", piexif.ImageIFD.DateTime): dt_str,
+        ("Exif", piexif.ExifIFD.ExposureTime): (1, exp_denom),
+        ("Exif", piexif.ExifIFD.ISOSpeedRatings): iso,
+        ("Exif", piexif.ExifIFD.DateTimeOriginal): dt_str,
+        ("Exif", piexif.ExifIFD.DateTimeDigitized): dt_str,
+        ("Exif", piexif.ExifIFD.SubSecTimeOriginal): subsec.encode(),
+        ("Exif", piexif.ExifIFD.SubSecTimeDigitized): subsec.encode(),
+        ("Exif", piexif.ExifIFD.PixelXDimension): px,
+        ("Exif", piexif.ExifIFD.PixelYDimension): py,
+        ("GPS", piexif.GPSIFD.GPSLatitudeRef): b"N" if lat >= 0 else b"S",
+        ("GPS", piexif.GPSIFD.GPSLatitude): _decimal_to_dms(lat),
+        ("GPS", piexif.GPSIFD.GPSLongitudeRef): b"E" if lon >= 0 else b"W",
+        ("GPS", piexif.GPSIFD.GPSLongitude): _decimal_to_dms(lon),
+        ("GPS", piexif.GPSIFD.GPSAltitudeRef): 0 if altitude >= 0 else 1,
+        ("GPS", piexif.GPSIFD.GPSAltitude): (int(abs(altitude) * 100), 100),
+        ("GPS", piexif.GPSIFD.GPSTimeStamp): ((timestamp.hour, 1), (timestamp.minute, 1), (timestamp.second, 1)),
+        ("GPS", piexif.GPSIFD.GPSDateStamp): timestamp.strftime("%Y:%m:%d").encode(),
+    }
 
-    # Build SEO description from keyword + city
-    seo_desc = ""
+def _seo_description(keyword, city_name):
     if keyword and city_name:
-        seo_desc = f"{keyword} en {city_name}"
-    elif keyword:
-        seo_desc = keyword
-    elif city_name:
-        seo_desc = city_name
+        return f"{keyword} en {city_name}"
+    return keyword or city_name or ""
 
+def _exif_dict(device_profile, seo_desc, keyword, photo_tags):
     zeroth_ifd = {
         piexif.ImageIFD.Make: device_profile["make"].encode(),
         piexif.ImageIFD.Model: device_profile["model"].encode(),
         piexif.ImageIFD.Software: device_profile["software"].encode(),
-        piexif.ImageIFD.DateTime: dt_str.encode(),
         piexif.ImageIFD.Orientation: 1,
         piexif.ImageIFD.XResolution: (72, 1),
         piexif.ImageIFD.YResolution: (72, 1),
@@ -75,20 +94,12 @@ def build_exif(lat, lon, altitude, timestamp=None, device_profile=None, image_wi
     exif_dict = {
         "0th": zeroth_ifd,
         "Exif": {
-            piexif.ExifIFD.ExposureTime: (1, exp_denom),
             piexif.ExifIFD.FNumber: device_profile["f_number"],
             piexif.ExifIFD.ExposureProgram: 2,
-            piexif.ExifIFD.ISOSpeedRatings: iso,
             piexif.ExifIFD.ExifVersion: b"0232",
-            piexif.ExifIFD.DateTimeOriginal: dt_str.encode(),
-            piexif.ExifIFD.DateTimeDigitized: dt_str.encode(),
-            piexif.ExifIFD.SubSecTimeOriginal: subsec.encode(),
-            piexif.ExifIFD.SubSecTimeDigitized: subsec.encode(),
             piexif.ExifIFD.ComponentsConfiguration: b"\x01\x02\x03\x00",
             piexif.ExifIFD.FocalLength: device_profile["focal_length"],
             piexif.ExifIFD.ColorSpace: 1,
-            piexif.ExifIFD.PixelXDimension: px,
-            piexif.ExifIFD.PixelYDimension: py,
             piexif.ExifIFD.FlashpixVersion: b"0100",
             piexif.ExifIFD.SceneCaptureType: 0,
             piexif.ExifIFD.Flash: 0,
@@ -100,32 +111,140 @@ def build_exif(lat, lon, altitude, timestamp=None, device_profile=None, image_wi
         },
         "GPS": {
             piexif.GPSIFD.GPSVersionID: (2, 3, 0, 0),
-            piexif.GPSIFD.GPSLatitudeRef: lat_ref,
-            piexif.GPSIFD.GPSLatitude: lat_dms,
-            piexif.GPSIFD.GPSLongitudeRef: lon_ref,
-            piexif.GPSIFD.GPSLongitude: lon_dms,
-            piexif.GPSIFD.GPSAltitudeRef: alt_ref,
-            piexif.GPSIFD.GPSAltitude: alt_val,
-            piexif.GPSIFD.GPSTimeStamp: ((timestamp.hour, 1), (timestamp.minute, 1), (timestamp.second, 1)),
-            piexif.GPSIFD.GPSDateStamp: timestamp.strftime("%Y:%m:%d").encode(),
             piexif.GPSIFD.GPSProcessingMethod: b"ASCII\x00\x00\x00GPS",
         },
         "1st": {},
     }
+    for (ifd, tag), value in photo_tags.items():
+        exif_dict[ifd][tag] = value
     return exif_dict
 
-def inject_exif(jpeg_bytes, exif_dict):
-    exif_bytes = piexif.dump(exif_dict)
-    tmp_in = tempfile.NamedTemporaryFile(suffix='.jpg', delete=False)
+def build_exif(lat, lon, altitude, timestamp=None, device_profile=None, image_width=None, image_height=None, keyword="", city_name=""):
+    device_profile, photo_tags = _draw_fields(lat, lon, altitude, timestamp, device_profile, image_width, image_height)
+    return _exif_dict(device_profile, _seo_description(keyword, city_name), keyword, photo_tags)
+
+# --- Templates -------------------------------------------------------------
+
+_TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 7: 1, 9: 4, 10: 8}
+_TEMPLATE_PLACEHOLDER = _photo_tags(0.0, 0.0, 0.0, datetime(2000, 1, 1), "000", 100, 125, 1, 1)
+_TEMPLATE_CACHE_SIZE = 256
+_templates = {}
+
+def _encode_value(value, type_id):
+    """TIFF big-endian encoding of one tag value, as piexif.dump writes it."""
+    if type_id == 2:
+        return value if value.endswith(b"\x00") else value + b"\x00"
+    if type_id in (1, 7):
+        return bytes(value) if isinstance(value, (bytes, tuple)) else bytes((value,))
+    if type_id == 3:
+        return struct.pack(">H", value)
+    if type_id == 4:
+        return struct.pack(">L", value)
+    if type_id == 5:
+        pairs = value if isinstance(value[0], tuple) else (value,)
+        return b"".join(struct.pack(">LL", n, d) for n, d in pairs)
+    raise ValueError(f"tipo TIFF sin soporte: {type_id}")
+
+def _ifd_entries(tiff, offset):
+    count = struct.unpack_from(">H", tiff, offset)[0]
+    for i in range(count):
+        entry = offset + 2 + 12 * i
+        tag, type_id, n = struct.unpack_from(">HHL", tiff, entry)
+        size = _TYPE_SIZES[type_id] * n
+        # Values up to four bytes live inside the entry, longer ones behind an offset.
+        yield tag, entry + 8 if size <= 4 else struct.unpack_from(">L", tiff, entry + 8)[0], size
+
+class ExifTemplate:
+    """One device profile's APP1 payload, serialized once.
+
+    The per-photo tags (_photo_tags) all serialize to a fixed width, so a
+    photo's payload is the template bytes with those slots overwritten; the
+    result is byte-for-byte what piexif.dump builds from the full dict.
+    Description and XP tags vary in length, so they are part of the template
+    key instead of a slot (they are constant across one request anyway).
+    """
+
+    def __init__(self, device_profile, seo_desc, keyword):
+        self.payload = piexif.dump(_exif_dict(device_profile, seo_desc, keyword, _TEMPLATE_PLACEHOLDER))
+        if self.payload[6:8] != b"MM":
+            raise ValueError("piexif.dump ya no escribe TIFF big-endian")
+        tiff = memoryview(self.payload)[6:]
+        ifds = {"0th": struct.unpack_from(">L", tiff, 4)[0]}
+        for tag, offset, _ in _ifd_entries(tiff, ifds["0th"]):
+            if tag == piexif.ImageIFD.ExifTag:
+                ifds["Exif"] = struct.unpack_from(">L", tiff, offset)[0]
+            elif tag == piexif.ImageIFD.GPSTag:
+                ifds["GPS"] = struct.unpack_from(">L", tiff, offset)[0]
+        slots = {}
+        for ifd, start in ifds.items():
+            for tag, offset, size in _ifd_entries(tiff, start):
+                if (ifd, tag) in _TEMPLATE_PLACEHOLDER:
+                    slots[(ifd, tag)] = (6 + offset, size, piexif.TAGS[ifd][tag]["type"])
+        self.slots = slots
+
+    def render(self, photo_tags):
+        out = bytearray(self.payload)
+        for key, value in photo_tags.items():
+            pos, size, type_id = self.slots[key]
+            data = _encode_value(value, type_id)
+            if len(data) > size or (type_id == 2 and len(data) != size):
+                raise ValueError(f"{key} no cabe en su ranura: {value!r}")
+            out[pos:pos + len(data)] = data
+        return bytes(out)
+
+def _template(device_profile, seo_desc, keyword):
+    key = (device_profile["make"], device_profile["model"], device_profile["software"], device_profile["f_number"], device_profile["focal_length"], seo_desc, keyword)
+    template = _templates.get(key)
+    if template is None:
+        if len(_templates) >= _TEMPLATE_CACHE_SIZE:
+            _templates.clear()
+        template = _templates[key] = ExifTemplate(device_profile, seo_desc, keyword)
+    return template
+
+def build_exif_bytes(lat, lon, altitude, timestamp=None, device_profile=None, image_width=None, image_height=None, keyword="", city_name="", subsec=None, iso=None, exp_denom=None):
+    """Same draws and same bytes as piexif.dump(build_exif(...)), from a cached template.
+
+    `subsec`, `iso` and `exp_denom` come from the batch plan when given;
+    otherwise they are drawn here like build_exif does.
+    """
+    device_profile, photo_tags = _draw_fields(lat, lon, altitude, timestamp, device_profile, image_width, image_height, subsec, iso, exp_denom)
+    seo_desc = _seo_description(keyword, city_name)
     try:
-        tmp_in.write(jpeg_bytes)
-        tmp_in.close()
-        piexif.insert(exif_bytes, tmp_in.name, tmp_in.name)
-        with open(tmp_in.name, 'rb') as f:
-            result = f.read()
-        return result
-    finally:
-        try:
-            os.unlink(tmp_in.name)
-        except OSError:
-            pass
+        return _template(device_profile, seo_desc, keyword).render(photo_tags)
+    except (ValueError, struct.error):
+        # A field that doesn't fit its slot (e.g. a year before 1000): serialize from scratch.
+        return piexif.dump(_exif_dict(device_profile, seo_desc, keyword, photo_tags))
+
+def _splice_app1(jpeg_bytes, exif_bytes):
+    """Return `jpeg_bytes` with its APP1 segments replaced by one EXIF segment.
+
+    Only the marker headers up to SOS are walked; the payload is copied once,
+    straight into the output. Like piexif.insert, a leading JFIF APP0 makes
+    way for the EXIF segment, which is what camera files look like.
+    """
+    view = memoryview(jpeg_bytes)
+    if view[:2] != b"\xff\xd8":
+        raise ValueError("El archivo no es un JPEG válido")
+    parts = [b"\xff\xd8", b"\xff\xe1" + struct.pack(">H", len(exif_bytes) + 2), exif_bytes]
+    pos = 2
+    first = True
+    while True:
+        if pos + 4 > len(view) or view[pos] != 0xFF:
+            raise ValueError("JPEG corrupto: marcador inválido")
+        marker = view[pos + 1]
+        if marker == 0xFF:
+            pos += 1
+            continue
+        if marker == 0xDA:
+            parts.append(view[pos:])
+            break
+        end = pos + 2 + struct.unpack_from(">H", view, pos + 2)[0]
+        if marker != 0xE1 and not (first and marker == 0xE0):
+            parts.append(view[pos:end])
+        first = False
+        pos = end
+    return b"".join(parts)
+
+def inject_exif(jpeg_bytes, exif):
+    """`exif` is an exif dict or an already serialized payload (build_exif_bytes)."""
+    return _splice_app1(jpeg_bytes, exif if isinstance(exif, bytes) else piexif.dump(exif))
@@ -0,0 +1,312 @@
+"""
+JOBS — Lotes asíncronos: las subidas se guardan en disco y se procesan en segundo plano.
+"""
+import asyncio
+import json
+import logging
+import mmap
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+from collections import deque
+from pathlib import Path
+from modules import metrics
+from modules.admission import get_scheduler, peak_bytes
+from modules.engine import get_engine
+from modules.ingest import probe
+from modules.pipeline import output_name, process_photo
+
+logger = logging.getLogger("gmb-sanitizer")
+
+SPOOL_DIR = Path(os.environ.get("GMB_SPOOL_DIR") or Path(tempfile.gettempdir()) / "gmb-jobs")
+JOB_TTL = float(os.environ.get("GMB_JOB_TTL", str(24 * 3600)))
+# A running job whose owner hasn't renewed its lease for this long is taken
+# to be orphaned (its worker died) and may be claimed by another.
+JOB_LEASE = float(os.environ.get("GMB_JOB_LEASE", "60"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    options TEXT NOT NULL,
+    created REAL NOT NULL,
+    finished REAL,
+    owner TEXT,
+    heartbeat REAL
+);
+CREATE TABLE IF NOT EXISTS files (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    filename TEXT,
+    output TEXT NOT NULL,
+    status TEXT NOT NULL,
+    error TEXT,
+    PRIMARY KEY (job_id, idx)
+);
+"""
+
+class JobStore:
+    """SQLite index of jobs plus one spool directory per job.
+
+    Layout: <root>/jobs.sqlite3, <root>/<job id>/in/<idx> for the uploads
+    and <root>/<job id>/out/<idx> for finished photos. Job status is
+    queued -> running -> done (or failed); files go pending -> done | error.
+    Everything needed to resume lives on disk, so a restarted worker picks up
+    queued and running jobs where they stopped.
+
+    Several workers may share one spool. A worker only runs a job it has
+    claimed (status and owner set in one conditional UPDATE) and renews the
+    claim's heartbeat while it runs; a running job whose heartbeat is older
+    than `lease` seconds is up for grabs again.
+    """
+
+    def __init__(self, root=SPOOL_DIR, lease=JOB_LEASE):
+        self.root = Path(root)
+        self.lease = lease
+        self.owner = uuid.uuid4().hex
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.root / "jobs.sqlite3", check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(_SCHEMA)
+            # Spools created before job claiming lack the lease columns.
+            columns = {row["name"] for row in self._db.execute("PRAGMA table_info(jobs)")}
+            for column in ("owner TEXT", "heartbeat REAL"):
+                if column.split()[0] not in columns:
+                    self._db.execute(f"ALTER TABLE jobs ADD COLUMN {column}")
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def _update(self, sql, params=()):
+        with self._lock:
+            return self._db.execute(sql, params).rowcount
+
+    def job_dir(self, job_id):
+        return self.root / job_id
+
+    def input_path(self, job_id, idx):
+        return self.job_dir(job_id) / "in" / str(idx)
+
+    def output_path(self, job_id, idx):
+        return self.job_dir(job_id) / "out" / str(idx)
+
+    def create(self, opts, uploads):
+        """Spool `uploads` ([(filename, fileobj, error)]) to disk and register a queued job.
+
+        Uploads that arrive with an error (rejected at admission) are
+        recorded as failed files and not spooled.
+        """
+        job_id = uuid.uuid4().hex
+        (self.job_dir(job_id) / "in").mkdir(parents=True)
+        (self.job_dir(job_id) / "out").mkdir()
+        rows = []
+        for idx, (filename, fileobj, error) in enumerate(uploads):
+            if error is None:
+                with open(self.input_path(job_id, idx), "wb") as f:
+                    shutil.copyfileobj(fileobj, f, 1 << 20)
+            rows.append((job_id, idx, filename, output_name(opts, idx, filename), "pending" if error is None else "error", None if error is None else f"{filename}: {error}"))
+        with self._lock:
+            self._db.execute("BEGIN")
+            self._db.executemany("INSERT INTO files (job_id, idx, filename, output, status, error) VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._db.execute("INSERT INTO jobs (id, status, options, created) VALUES (?, 'queued', ?, ?)", (job_id, json.dumps(opts), time.time()))
+            self._db.execute("COMMIT")
+        return job_id
+
+    def get(self, job_id):
+        rows = self._execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        if not rows:
+            return None
+        job = dict(rows[0])
+        job["options"] = json.loads(job["options"])
+        job["files"] = [dict(r) for r in self._execute("SELECT idx, filename, output, status, error FROM files WHERE job_id = ? ORDER BY idx", (job_id,))]
+        return job
+
+    def unfinished(self, claimed=False):
+        """Jobs some worker may claim: queued ones, and running ones whose lease ran out.
+
+        With `claimed`, running jobs another worker still holds count too.
+        """
+        stale = float("inf") if claimed else time.time() - self.lease
+        return [r["id"] for r in self._execute(
+            "SELECT id FROM jobs WHERE status = 'queued' OR (status = 'running' AND (heartbeat IS NULL OR heartbeat < ?)) ORDER BY created",
+            (stale,),
+        )]
+
+    def claim(self, job_id):
+        """Take `job_id` for this store's owner; False when another worker holds a live claim or it is finished."""
+        now = time.time()
+        return self._update(
+            "UPDATE jobs SET status = 'running', owner = ?, heartbeat = ? WHERE id = ? AND "
+            "(status = 'queued' OR (status = 'running' AND (owner = ? OR heartbeat IS NULL OR heartbeat < ?)))",
+            (self.owner, now, job_id, self.owner, now - self.lease),
+        ) == 1
+
+    def renew(self, job_id):
+        """Refresh this owner's claim; False if it was lost to another worker."""
+        return self._update("UPDATE jobs SET heartbeat = ? WHERE id = ? AND owner = ?", (time.time(), job_id, self.owner)) == 1
+
+    def set_status(self, job_id, status, owned=False):
+        """Set the job's status; with `owned`, only while this store's owner holds it. True if a row changed."""
+        finished = time.time() if status in ("done", "failed") else None
+        if owned:
+            return self._update("UPDATE jobs SET status = ?, finished = ? WHERE id = ? AND owner = ?", (status, finished, job_id, self.owner)) == 1
+        return self._update("UPDATE jobs SET status = ?, finished = ? WHERE id = ?", (status, finished, job_id)) == 1
+
+    def set_file(self, job_id, idx, status, error=None):
+        self._execute("UPDATE files SET status = ?, error = ? WHERE job_id = ? AND idx = ?", (status, error, job_id, idx))
+
+    def purge(self, ttl=JOB_TTL):
+        """Delete finished jobs older than `ttl` seconds, spool included."""
+        for row in self._execute("SELECT id FROM jobs WHERE status IN ('done', 'failed') AND finished < ?", (time.time() - ttl,)):
+            shutil.rmtree(self.job_dir(row["id"]), ignore_errors=True)
+            with self._lock:
+                self._db.execute("DELETE FROM files WHERE job_id = ?", (row["id"],))
+                self._db.execute("DELETE FROM jobs WHERE id = ?", (row["id"],))
+
+def _process_spooled(path, job):
+    # Decode straight from the page cache instead of reading a copy first.
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return process_photo(mm, job)
+
+def _probe_spooled(path):
+    with open(path, "rb") as f:
+        return (*probe(f), os.fstat(f.fileno()).st_size)
+
+class JobRunner:
+    """Background task that drains the store's queue, one job at a time.
+
+    Photos inside a job are fanned out over the shared engine exactly like
+    /api/sanitize does; each result is written to the job's out/ directory
+    and recorded before moving on, which is what makes a job resumable.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+        self._wakeup.set()
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            self._wakeup.clear()
+            for job_id in self.store.unfinished():
+                if not self.store.claim(job_id):
+                    continue  # another worker got it first
+                # Its own task, so the heartbeat can stop this job alone.
+                run = asyncio.create_task(self._run(job_id))
+                try:
+                    await run
+                except asyncio.CancelledError:
+                    if not run.cancelled() or asyncio.current_task().cancelling():
+                        raise
+                    logger.warning(f"Job {job_id}: stopped, another worker holds it now")
+                except Exception:
+                    logger.error(f"Job {job_id} crashed:\n{traceback.format_exc()}")
+                    self.store.set_status(job_id, "failed", owned=True)
+            await asyncio.to_thread(self.store.purge)
+            try:
+                # Wake up at least once per lease to adopt jobs orphaned by a dead worker.
+                await asyncio.wait_for(self._wakeup.wait(), self.store.lease)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _run(self, job_id):
+        job = self.store.get(job_id)
+        opts = job["options"]
+        todo = [f for f in job["files"] if f["status"] == "pending"]
+        logger.info(f"Job {job_id}: {len(todo)}/{len(job['files'])} photos to process")
+        engine = get_engine()
+        from modules.planner import plan_batch
+        # Plan the whole job, not just what is left, so resumed photos get the rows they had.
+        plan = plan_batch(len(job["files"]), opts, opts.get("seed"))
+        pending = deque()
+
+        async def _collect(entry, task):
+            await asyncio.wait([task])
+            try:
+                final, _, stages = task.result()
+                out = self.store.output_path(job_id, entry["idx"])
+                await asyncio.to_thread(out.write_bytes, final)
+                self.store.set_file(job_id, entry["idx"], "done")
+                metrics.observe_stages(stages)
+                metrics.PHOTOS.inc(outcome="ok")
+            except Exception as e:
+                logger.error("Job %s: FAILED processing %s:\n%s", job_id, entry["filename"], traceback.format_exc())
+                metrics.PHOTOS.inc(outcome="error")
+                self.store.set_file(job_id, entry["idx"], "error", f"{entry['filename']}: {str(e)}")
+
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, asyncio.current_task()))
+        try:
+            for entry in todo:
+                photo = plan.row(entry["idx"])
+                path = self.store.input_path(job_id, entry["idx"])
+                try:
+                    estimate = peak_bytes(*await asyncio.to_thread(_probe_spooled, path), photo["max_dimension"])
+                except Exception:
+                    estimate = 0  # unreadable header: let the worker report the error
+                task = await get_scheduler().run(job_id, estimate, engine.run, _process_spooled, str(path), photo)
+                pending.append((entry, task))
+                while len(pending) >= engine.window:
+                    await _collect(*pending.popleft())
+            while pending:
+                await _collect(*pending.popleft())
+        finally:
+            heartbeat.cancel()
+            for _, task in pending:
+                task.cancel()
+        # The inputs go only if the job was still ours: a worker that took it
+        # over may be reading them.
+        if not self.store.set_status(job_id, "done", owned=True):
+            logger.warning(f"Job {job_id}: finished after another worker took it over; left to that worker")
+            return
+        shutil.rmtree(self.store.job_dir(job_id) / "in", ignore_errors=True)
+        logger.info(f"Job {job_id}: done")
+
+    async def _heartbeat(self, job_id, run):
+        """Renew the claim while `run` works on the job; cancel it once the claim is lost."""
+        delay = self.store.lease / 3
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                renewed = await asyncio.to_thread(self.store.renew, job_id)
+            except sqlite3.Error as e:
+                # Usually "database is locked": retry well before the lease runs out.
+                logger.warning(f"Job {job_id}: lease renewal failed ({e}), retrying")
+                delay = self.store.lease / 10
+                continue
+            if not renewed:
+                logger.warning(f"Job {job_id}: claim lost to another worker, stopping")
+                run.cancel()
+                return
+            delay = self.store.lease / 3
+
+_runner = None
+
+def get_job_runner():
+    global _runner
+    if _runner is None:
+        _runner = JobRunner(JobStore())
+    return _runner
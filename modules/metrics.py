@@ -0,0 +1,137 @@
+"""
+METRICS — Contadores, histogramas y tiempos por etapa, expuestos en formato de texto Prometheus.
+"""
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+CONTENT_TYPE = "text/plain; version=0.0.4"  # Starlette appends the charset
+
+_registry = []
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+def _number(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._samples(key, value))
+        return lines
+
+    def _samples(self, key, value):
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram; buckets are upper bounds in seconds by default."""
+
+    kind = "histogram"
+    DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value)
+
+    def _samples(self, key, value):
+        counts, total = value
+        lines = []
+        running = 0
+        for bound, count in zip(self.buckets, counts):
+            running += count
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, [('le', _number(bound))])} {running}")
+        lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+        lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {running}")
+        return lines
+
+class Callback(_Metric):
+    """A value read at scrape time, e.g. counters another module already keeps."""
+
+    def __init__(self, name, help, fn, kind="gauge"):
+        super().__init__(name, help)
+        self.kind = kind
+        self._fn = fn
+
+    def render(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", f"{self.name} {_number(self._fn())}"]
+
+def render():
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+class StageTimer:
+    """Wall-clock seconds per named stage, in the spirit of AllocCounter.
+
+    Lives inside the worker and travels back with the result as a plain
+    dict (`stages`), so it works across the process pool.
+    """
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def __call__(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[stage] = self.stages.get(stage, 0.0) + time.perf_counter() - start
+
+def server_timing(stages):
+    """Server-Timing header value from {stage: seconds}."""
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in stages.items())
+
+REQUESTS = Counter("gmb_http_requests_total", "HTTP requests by route and status code.", ("route", "method", "status"))
+STAGE_SECONDS = Histogram("gmb_stage_seconds", "Time spent per processing stage, per photo.", ("stage",))
+PHOTOS = Counter("gmb_photos_total", "Photos processed, by outcome.", ("outcome",))
+BYTES_IN = Counter("gmb_bytes_in_total", "Upload bytes read for processing.")
+BYTES_OUT = Counter("gmb_bytes_out_total", "Response bytes produced by photo endpoints.")
+GEOCODE_UPSTREAM_SECONDS = Histogram("gmb_geocode_upstream_seconds", "Latency of geocoding requests sent upstream, by outcome.", ("outcome",))
+
+def observe_stages(stages):
+    for stage, seconds in stages.items():
+        STAGE_SECONDS.observe(seconds, stage=stage)
@@ -0,0 +1,67 @@
+"""
+NOISE — Ruido gaussiano rápido con generador propio por petición o worker.
+"""
+import os
+from functools import lru_cache
+import numpy as np
+
+_BAND_VALUES = 1 << 20  # noise values drawn per band of rows
+_POOL_TILE = 256
+# Callers may feed a frame to add_to() in row strips, top to bottom; strips
+# starting on multiples of this many rows draw exactly what one call on the
+# whole frame would (both modes consume the generator in row-major order).
+STRIP_ALIGN = _POOL_TILE
+
+# The pool is the same in every process, so a photo's seed alone (which
+# picks the windows) replays its noise, whichever worker draws it.
+_POOL_SEED = 0x6D62_706F_6F6C
+
+@lru_cache(maxsize=1)
+def _tile_pool(count=8, tile=_POOL_TILE):
+    # Built once per worker; windows are cut from tiles twice the cell size
+    # so neighbouring cells rarely line up.
+    rng = np.random.default_rng(_POOL_SEED)
+    return rng.standard_normal((count, 2 * tile, 2 * tile, 3), dtype=np.float32)
+
+class NoiseSource:
+    """Adds zero-mean Gaussian noise to float32 frames.
+
+    Each source owns a numpy.random.Generator, so photos processed in
+    parallel never share RNG state. By default every value is a fresh
+    float32 draw, made one band of rows at a time into a small scratch
+    buffer. With `pool=True` (or GMB_NOISE_POOL=1) the frame is instead
+    covered with windows of a precomputed, fixed-seed tile pool at random
+    offsets, which trades some randomness for a large speed-up.
+    """
+
+    def __init__(self, rng=None, pool=None):
+        self.rng = rng if isinstance(rng, np.random.Generator) else np.random.default_rng(rng)
+        self.pool = os.environ.get("GMB_NOISE_POOL", "0") == "1" if pool is None else pool
+
+    def add_to(self, buf, sigma):
+        """buf += N(0, sigma), in place; `buf` is an (h, w, c) float32 array."""
+        sigma = np.float32(sigma)
+        if self.pool:
+            self._add_pooled(buf, sigma)
+            return
+        h, w, c = buf.shape
+        rows = max(1, min(h, _BAND_VALUES // (w * c)))
+        scratch = np.empty((rows, w, c), dtype=np.float32)
+        for y in range(0, h, rows):
+            band = buf[y:y + rows]
+            draw = scratch[:band.shape[0]]
+            self.rng.standard_normal(out=draw, dtype=np.float32)
+            draw *= sigma
+            band += draw
+
+    def _add_pooled(self, buf, sigma):
+        pool = _tile_pool()
+        t = _POOL_TILE
+        h, w, c = buf.shape
+        for y in range(0, h, t):
+            for x in range(0, w, t):
+                cell = buf[y:y + t, x:x + t]
+                ch, cw = cell.shape[:2]
+                i = self.rng.integers(len(pool))
+                oy, ox = self.rng.integers(0, t + 1, size=2)
+                cell += pool[i, oy:oy + ch, ox:ox + cw, :c] * sigma
@@ -0,0 +1,121 @@
+"""
+PIPELINE — Procesa una sola foto: decodifica, limpia, transforma e inyecta EXIF.
+"""
+import logging
+import os
+import re
+import unicodedata
+from io import BytesIO
+from modules.allocs import AllocCounter
+from modules.metrics import StageTimer
+
+# Pillow, NumPy and piexif (through the stripper, uniquifier and injector)
+# are imported by process_photo on first use: main imports this module for
+# output_name and ENCODER_PROFILES, and a cold start serving /api/cities or
+# a static file shouldn't pay for the image stack.
+
+logger = logging.getLogger("gmb-sanitizer")
+
+def slugify(text: str) -> str:
+    """Convert text to URL/filename-friendly slug."""
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+    text = text.lower().strip()
+    text = re.sub(r'[^a-z0-9\s-]', '', text)
+    text = re.sub(r'[\s_-]+', '-', text)
+    text = text.strip('-')
+    return text or 'foto'
+
+def output_name(opts, idx, filename):
+    # SEO-friendly filename: keyword-city-N.jpg
+    keyword, city = opts["keyword"], opts["city"]
+    if keyword:
+        slug = slugify(keyword)
+        city_slug = slugify(city) if city else ""
+        if city_slug:
+            return f"{slug}-{city_slug}-{idx + 1}.jpg"
+        return f"{slug}-{idx + 1}.jpg"
+    original = os.path.splitext(os.path.basename(filename or f"photo_{idx}"))[0]
+    return f"{original}_gmb.jpg"
+
+# Keyword arguments for Image.save per encoder profile. Measured with
+# python -m benchmarks.bench_encoder (12 MP synthetic photo, "medium", q=94;
+# the other intensities give the same ratios within a few percent):
+#   fast       72 ms   3.68 MB (100%)  standard Huffman tables, no extra pass
+#   balanced  198 ms   3.54 MB ( 96%)  optimized Huffman tables (the historical default)
+#   compact   513 ms   3.38 MB ( 92%)  optimized + progressive scans
+# All three keep libjpeg's 4:2:0 chroma subsampling.
+ENCODER_PROFILES = {
+    "fast": {"optimize": False, "subsampling": "4:2:0"},
+    "balanced": {"optimize": True},
+    "compact": {"optimize": True, "progressive": True, "subsampling": "4:2:0"},
+}
+DEFAULT_ENCODER_PROFILE = os.environ.get("GMB_ENCODER_PROFILE", "balanced")
+
+def encode_jpeg(img, quality, profile=DEFAULT_ENCODER_PROFILE):
+    buf = BytesIO()
+    img.save(buf, "JPEG", quality=quality, **ENCODER_PROFILES.get(profile, ENCODER_PROFILES["balanced"]))
+    return buf
+
+def process_photo(source, job):
+    """Run every per-file stage for one upload.
+
+    `source` is the upload's bytes or any seekable file object (a spooled
+    upload, an mmap of a spooled file); the decoder reads it in place.
+
+    `job` is one BatchPlan row (timestamp, jittered lat/lon, altitude,
+    device, keyword, city, max_dimension, quality, encoder_profile, and the
+    "exif" and "uniquify" parameters); nothing here draws random numbers, so the same
+    contents and row always give the same bytes. It must stay picklable:
+    this runs inside the engine's worker processes. Returns the final JPEG
+    bytes, the per-stage allocation tally and the per-stage timings.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        if len(source) == 0:
+            raise ValueError("Archivo vacío (0 bytes)")
+        source = BytesIO(source)  # shares the bytes' buffer, no copy
+    from PIL import Image
+    from modules.ingest import MAX_FILE_MEGAPIXELS
+    from modules.injector import build_exif_bytes, inject_exif
+    from modules.stripper import strip_all_metadata
+    from modules.uniquifier import uniquify_image
+    # Pillow refuses frames over 2 x MAX_IMAGE_PIXELS (89 MP by default) as
+    # decompression bombs; admission already applied the real per-file cap.
+    Image.MAX_IMAGE_PIXELS = int(MAX_FILE_MEGAPIXELS * 1e6)
+    allocs = AllocCounter()
+    timer = StageTimer()
+
+    with timer("decode"):
+        img = Image.open(source)
+        max_dim = job.get("max_dimension")
+        if max_dim and img.format == "JPEG" and max(img.size) > max_dim:
+            # Let libjpeg scale the DCT by 1/2, 1/4 or 1/8 while decoding; the draft is
+            # never smaller than requested and the uniquifier does the final resize.
+            ratio = max_dim / max(img.size)
+            img.draft("RGB", (round(img.width * ratio), round(img.height * ratio)))
+        img.load()
+    allocs.image("decode", img)
+    logger.debug("  Opened: mode=%s, size=%s", img.mode, img.size)
+
+    with timer("strip"):
+        clean = strip_all_metadata(img, allocs)
+    del img
+
+    with timer("uniquify"):
+        unique = uniquify_image(clean, job["uniquify"], max_dimension=max_dim, allocs=allocs)
+    del clean
+    quality = job["quality"]
+    logger.debug("  Uniquified: size=%s, quality=%s", unique.size, quality)
+
+    with timer("encode"):
+        jpeg = encode_jpeg(unique, quality, job.get("encoder_profile", DEFAULT_ENCODER_PROFILE)).getbuffer()
+    allocs.add("encode", len(jpeg))
+
+    with timer("exif"):
+        exif = build_exif_bytes(lat=job["lat"], lon=job["lon"], altitude=job["altitude"], timestamp=job["timestamp"], device_profile=job["device"], image_width=unique.size[0], image_height=unique.size[1], keyword=job["keyword"], city_name=job["city"], **job["exif"])
+
+    with timer("inject"):
+        final = inject_exif(jpeg, exif)
+    jpeg.release()
+    allocs.add("exif", len(final))
+    logger.debug("  Encoded %d bytes (allocated %.1f MB)", len(final), allocs.total / 1e6)
+    return final, allocs.stages, timer.stages
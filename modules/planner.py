@@ -0,0 +1,106 @@
+"""
+PLANNER — Sortea de una vez los parámetros de todas las fotos de un lote.
+"""
+from datetime import datetime
+from functools import lru_cache
+import numpy as np
+from data.colombia import DEVICE_PROFILES
+from modules.injector import device_choices
+from modules.uniquifier import intensity_settings
+
+def new_seed():
+    """A fresh 128-bit seed; plain int, so it round-trips through JSON and form fields."""
+    return int(np.random.SeedSequence().entropy)
+
+@lru_cache(maxsize=1)
+def _device_tables():
+    # Per-device ISO / exposure options, padded into 2-D arrays so a whole
+    # batch picks its values with one fancy-index each.
+    iso, exp = zip(*(device_choices(d) for d in DEVICE_PROFILES))
+    iso = [opts or [200] for opts in iso]
+    exp = [opts or [125] for opts in exp]
+    def pad(rows):
+        table = np.zeros((len(rows), max(map(len, rows))), dtype=np.int64)
+        for i, row in enumerate(rows):
+            table[i, :len(row)] = row
+        return table, np.array([len(r) for r in rows])
+    return pad(iso), pad(exp)
+
+class BatchPlan:
+    """Every random per-photo parameter of a batch, one NumPy array per column.
+
+    Columns are drawn in a fixed order from a single Generator seeded with
+    `seed`, so the same (n, opts, seed) always gives the same plan. The
+    pixel and EXIF stages take everything random from a row of it, which
+    makes a photo's output a pure function of (pixels, row): any worker can
+    run it, and a batch can be replayed exactly for benchmarking.
+    """
+
+    def __init__(self, n, opts, seed=None):
+        self.seed = new_seed() if seed is None else int(seed)
+        self.opts = opts
+        rng = np.random.default_rng(self.seed)
+        s = intensity_settings(opts["intensity"])
+
+        # Capture time: a random day in [date_from, date_to], daylight hours.
+        dt_from = np.datetime64(datetime.fromisoformat(opts["date_from"]), "s")
+        dt_to = np.datetime64(datetime.fromisoformat(opts["date_to"]), "s")
+        total_sec = max(1, int((dt_to - dt_from) / np.timedelta64(1, "s")))
+        day = (dt_from + rng.integers(0, total_sec + 1, n)).astype("datetime64[D]")
+        clock = rng.integers(7, 20, n) * 3600 + rng.integers(0, 60, n) * 60 + rng.integers(0, 60, n)
+        self.timestamp = day.astype("datetime64[s]") + clock
+
+        location = opts["location"]
+        offset = opts["jitter_radius"] / 111_000
+        self.lat = location["lat"] + rng.uniform(-offset, offset, n)
+        self.lon = location["lon"] + rng.uniform(-offset, offset, n)
+
+        self.device = rng.integers(0, len(DEVICE_PROFILES), n)
+        if not opts["random_device"] and opts["device_id"] is not None:
+            self.device[:] = opts["device_id"]
+        (iso, iso_len), (exp, exp_len) = _device_tables()
+        self.iso = iso[self.device, (rng.random(n) * iso_len[self.device]).astype(np.int64)]
+        self.exp_denom = exp[self.device, (rng.random(n) * exp_len[self.device]).astype(np.int64)]
+        self.subsec = rng.integers(100, 1000, n)
+
+        lo, hi = s["jpeg_quality"]
+        self.quality = rng.integers(lo, hi + 1, n)
+        self.angle = rng.uniform(-s["rotation"], s["rotation"], n)
+        self.crop = rng.integers(0, s["crop_px"] + 1, (n, 4))
+        self.shifts = rng.uniform(-s["color_shift"], s["color_shift"], (n, 3)).astype(np.float32)
+        self.brightness = rng.uniform(*s["brightness"], n)
+        self.contrast = rng.uniform(*s["contrast"], n)
+        self.sharpness = rng.uniform(*s["sharpness"], n)
+        self.noise_sigma = s["noise_sigma"]
+        self.noise_seed = rng.integers(0, np.iinfo(np.int64).max, n)
+
+    def __len__(self):
+        return len(self.quality)
+
+    def row(self, i):
+        """Photo `i` as the plain, picklable job dict process_photo takes."""
+        opts = self.opts
+        return {
+            "timestamp": self.timestamp[i].astype(datetime),
+            "lat": float(self.lat[i]), "lon": float(self.lon[i]),
+            "altitude": opts["location"].get("altitude", 100),
+            "device": DEVICE_PROFILES[self.device[i]],
+            "keyword": opts["keyword"], "city": opts["city"],
+            "max_dimension": opts["max_dimension"],
+            "encoder_profile": opts.get("encoder_profile"),
+            "quality": int(self.quality[i]),
+            "exif": {"subsec": str(self.subsec[i]), "iso": int(self.iso[i]), "exp_denom": int(self.exp_denom[i])},
+            "uniquify": {
+                "angle": float(self.angle[i]),
+                "crop": tuple(int(v) for v in self.crop[i]),
+                "shifts": tuple(float(v) for v in self.shifts[i]),
+                "brightness": float(self.brightness[i]),
+                "contrast": float(self.contrast[i]),
+                "sharpness": float(self.sharpness[i]),
+                "noise_sigma": self.noise_sigma,
+                "noise_seed": int(self.noise_seed[i]),
+            },
+        }
+
+def plan_batch(n, opts, seed=None):
+    return BatchPlan(n, opts, seed)
@@ -0,0 +1,74 @@
+"""
+PRECOMPUTED — Respuestas fijas serializadas una sola vez, con ETag fuerte, Cache-Control, 304 y variantes comprimidas.
+"""
+import gzip
+import hashlib
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:  # optional: gzip alone is understood by every browser
+    brotli = None
+
+def _accepted(header):
+    """Content codings an Accept-Encoding header allows (q > 0)."""
+    codings = set()
+    for part in (header or "").split(","):
+        coding, _, params = part.partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            codings.add(coding.strip().lower())
+    return codings
+
+def _matches(if_none_match, etag):
+    # If-None-Match uses the weak comparison: W/ prefixes don't count.
+    if not if_none_match:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+class Precomputed:
+    """A response body that never changes while the process lives, plus its compressed variants.
+
+    Everything is computed in the constructor: the gzip (and, when the
+    brotli package is installed, br) bodies and one strong ETag per variant,
+    derived from the content so it only changes when the bytes do. A
+    variant that doesn't come out smaller than the plain body is dropped.
+    """
+
+    def __init__(self, body, media_type, cache_control):
+        self.media_type = media_type
+        self.cache_control = cache_control
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.variants = {"identity": (body, f'"{digest}"')}
+        compressed = {"gzip": gzip.compress(body, 9, mtime=0)}
+        if brotli is not None:
+            compressed["br"] = brotli.compress(body, quality=11)
+        for coding, data in compressed.items():
+            if len(data) < len(body):
+                self.variants[coding] = (data, f'"{digest}-{coding}"')
+
+    def _coding(self, accept_encoding):
+        accepted = _accepted(accept_encoding)
+        for coding in ("br", "gzip"):
+            if coding in self.variants and (coding in accepted or "*" in accepted):
+                return coding
+        return "identity"
+
+    def response(self, request):
+        """The best variant for this request, or a bodiless 304 when the client already has it."""
+        coding = self._coding(request.headers.get("accept-encoding"))
+        body, etag = self.variants[coding]
+        headers = {"ETag": etag, "Cache-Control": self.cache_control, "Vary": "Accept-Encoding"}
+        if _matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        if coding != "identity":
+            headers["Content-Encoding"] = coding
+        return Response(body, media_type=self.media_type, headers=headers)
@@ -0,0 +1,35 @@
+"""
+TARSTREAM — Escribe un TAR sin comprimir entrada por entrada para enviarlo mientras se genera.
+"""
+import tarfile
+import time
+
+_BLOCK = 512
+
+class TarStream:
+    """Incremental ustar/PAX writer with the same add()/close() shape as ZipStream.
+
+    Entries are stored as-is (JPEG data doesn't compress), so each one is a
+    header, the data and zero padding to the next 512-byte block. Non-ASCII
+    names get a PAX header. TAR has no archive comment; `close()` accepts one
+    only to match ZipStream and ignores it.
+    """
+
+    def __init__(self):
+        self.offset = 0
+
+    def add(self, name, data, compression=None):
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = int(time.time())
+        info.mode = 0o644
+        header = info.tobuf(format=tarfile.PAX_FORMAT, encoding="utf-8")
+        padding = b"\0" * (-len(data) % _BLOCK)
+        chunk = b"".join((header, data, padding))
+        self.offset += len(chunk)
+        return chunk
+
+    def close(self, comment=b""):
+        end = b"\0" * (2 * _BLOCK)
+        self.offset += len(end)
+        return end
@@ -1,9 +1,17 @@
 """
 UNIQUIFIER — Transforma la imagen a nivel de píxel para hacerla irrastreable.
 """
-import random
+import math
+import os
 import numpy as np
 from PIL import Image, ImageEnhance
+from modules.allocs import AllocCounter, image_nbytes
+from modules.noise import STRIP_ALIGN, NoiseSource
+
+# Frames with more output pixels than this go through the per-pixel stages in
+# horizontal strips, in place (see _tiled_kernel_and_sharpen); 0 disables tiling.
+TILE_PIXELS = int(os.environ.get("GMB_TILE_PIXELS", str(24_000_000)))
+_STRIP_PIXELS = 1 << 22  # working set per strip, rounded to whole STRIP_ALIGN rows
 
 _SETTINGS = {
     "low": {"noise_sigma": 1.5, "color_shift": 1, "brightness": (0.99, 1.01), "contrast": (0.99, 1.01), "sharpness": (0.97, 1.03), "crop_px": 3, "rotation": 0.3, "jpeg_quality": (92, 96)},
@@ -11,23 +19,128 @@ _SETTINGS = {
     "high": {"noise_sigma": 4.0, "color_shift": 4, "brightness": (0.95, 1.05), "contrast": (0.95, 1.05), "sharpness": (0.90, 1.10), "crop_px": 12, "rotation": 1.0, "jpeg_quality": (84, 91)},
 }
 
-def uniquify_image(image, intensity="medium"):
-    s = _SETTINGS.get(intensity, _SETTINGS["medium"])
-    img = image.copy()
-    angle = random.uniform(-s["rotation"], s["rotation"])
-    img = img.rotate(angle, resample=Image.BICUBIC, expand=False, fillcolor=(255, 255, 255))
+_LUMA = np.array([0.299, 0.587, 0.114])
+
+def _geometric_transform(img, angle, crop, scale=1.0):
+    """Rotate about the centre, crop and optionally shrink with a single resample.
+
+    Equivalent to img.rotate(angle, BICUBIC).crop(...) followed by a resize
+    by 1/scale, but only the output pixels are ever interpolated. Shrinking
+    by 2x or more first goes through Image.reduce so the bicubic step never
+    has to skip source pixels.
+    """
+    cl, ct, cr, cb = crop
+    w, h = img.size
+    if angle == 0 and scale == 1:
+        return img.crop((cl, ct, w - cr, h - cb))
+    out_w = max(1, round((w - cl - cr) / scale))
+    out_h = max(1, round((h - ct - cb) / scale))
+    if scale >= 2:
+        factor = int(scale)
+        img = img.reduce(factor)
+        cl, ct, scale = cl / factor, ct / factor, scale / factor
+        w, h = img.size
+    # Inverse map, output -> source: rotate (cl + x * scale, ct + y * scale) about the centre.
+    rad = -math.radians(angle)
+    cos, sin = math.cos(rad), math.sin(rad)
+    dx, dy = cl - w / 2.0, ct - h / 2.0
+    matrix = (
+        cos * scale, sin * scale, cos * dx + sin * dy + w / 2.0,
+        -sin * scale, cos * scale, -sin * dx + cos * dy + h / 2.0,
+    )
+    return img.transform((out_w, out_h), Image.AFFINE, matrix, resample=Image.BICUBIC, fillcolor=(255, 255, 255))
+
+def _kernel_coefficients(img, shifts, brightness, contrast):
+    # The pivot comes from the whole frame's histogram, so strips share it.
+    hist = np.array(img.histogram(), dtype=np.float64).reshape(3, 256)
+    means = hist @ np.arange(256) / (img.width * img.height) + shifts
+    pivot = int(brightness * float(means @ _LUMA) + 0.5)
+    a = np.float32(brightness * contrast)
+    k = (a * shifts + (1 - contrast) * pivot).astype(np.float32)
+    return a, k
+
+def _apply_kernel(arr, a, k, noise, sigma, allocs):
+    buf = allocs.array("kernel", np.empty(arr.shape, dtype=np.float32))
+    np.multiply(arr, a, out=buf)
+    buf += k
+    noise.add_to(buf, sigma * a)
+    np.rint(buf, out=buf)  # the cast below truncates
+    np.clip(buf, 0, 255, out=buf)
+    return allocs.array("kernel", buf.astype(np.uint8))
+
+def _pixel_kernel(img, noise, sigma, shifts, brightness, contrast, allocs):
+    """Noise, per-channel shift, brightness and contrast in a single float32 pass.
+
+    The three steps are affine in the pixel value, so they fold into
+    y = a * (x + noise) + k[c], with a = brightness * contrast and k[c]
+    carrying the channel shift and ImageEnhance.Contrast's pivot (the mean
+    luma of the brightened image, taken here from the histogram).
+    """
+    a, k = _kernel_coefficients(img, shifts, brightness, contrast)
+    arr = allocs.array("kernel", np.asarray(img))
+    out = _apply_kernel(arr, a, k, noise, sigma, allocs)
+    return allocs.image("kernel", Image.fromarray(out))
+
+def _strip_rows(width):
+    return max(1, _STRIP_PIXELS // (width * STRIP_ALIGN)) * STRIP_ALIGN
+
+def _tiled_kernel_and_sharpen(img, noise, sigma, shifts, brightness, contrast, sharpness, allocs):
+    """_pixel_kernel and the sharpness step, in place on `img`, one strip of rows at a time.
+
+    `img` must be the geometry step's own output (it always is a fresh
+    image). The bytes are the same as on the whole-frame path: the kernel
+    is per-pixel with frame-wide coefficients and the noise stream is
+    consumed in the same order (strips start on STRIP_ALIGN rows). Each
+    sharpen strip is cut with a one-row halo above and below, all the 3x3
+    SMOOTH filter reads; the row above is kept from before it was
+    overwritten, and the halo rows themselves are dropped. Working buffers
+    are strip-sized instead of frame-sized.
+    """
+    w, h = img.size
+    rows = _strip_rows(w)
+    a, k = _kernel_coefficients(img, shifts, brightness, contrast)
+    for y in range(0, h, rows):
+        box = (0, y, w, min(h, y + rows))
+        arr = allocs.array("kernel", np.asarray(img.crop(box)))
+        img.paste(Image.fromarray(_apply_kernel(arr, a, k, noise, sigma, allocs)), box[:2])
+    above = None
+    for y in range(0, h, rows):
+        top, end, bottom = max(0, y - 1), min(h, y + rows), min(h, y + rows + 1)
+        strip = img.crop((0, top, w, bottom))
+        if above is not None:
+            strip.paste(above, (0, 0))
+        above = img.crop((0, end - 1, w, end))
+        sharpened = ImageEnhance.Sharpness(strip).enhance(sharpness)
+        allocs.add("sharpen", 3 * image_nbytes(strip))
+        img.paste(sharpened.crop((0, y - top, w, end - top)), (0, y))
+    return img
+
+def intensity_settings(intensity):
+    return _SETTINGS.get(intensity, _SETTINGS["medium"])
+
+def uniquify_image(image, params, max_dimension=None, allocs=None):
+    """Return the transformed image; a pure function of the pixels and `params`.
+
+    `params` is one row of a BatchPlan ("uniquify"): angle, crop, shifts,
+    brightness, contrast, sharpness, noise_sigma and noise_seed. The same
+    image and row always give the same output, on any worker.
+    """
+    allocs = allocs if allocs is not None else AllocCounter()
+    noise = NoiseSource(params["noise_seed"])
+    img = image
     w, h = img.size
-    cl, ct, cr, cb = random.randint(0, s["crop_px"]), random.randint(0, s["crop_px"]), random.randint(0, s["crop_px"]), random.randint(0, s["crop_px"])
-    if w - cl - cr > 200 and h - ct - cb > 200:
-        img = img.crop((cl, ct, w - cr, h - cb))
-    arr = np.array(img, dtype=np.float32)
-    noise = np.random.normal(0, s["noise_sigma"], arr.shape).astype(np.float32)
-    arr += noise
-    for c in range(min(3, arr.shape[2])):
-        arr[:, :, c] += random.uniform(-s["color_shift"], s["color_shift"])
-    arr = np.clip(arr, 0, 255).astype(np.uint8)
-    img = Image.fromarray(arr)
-    img = ImageEnhance.Brightness(img).enhance(random.uniform(*s["brightness"]))
-    img = ImageEnhance.Contrast(img).enhance(random.uniform(*s["contrast"]))
-    img = ImageEnhance.Sharpness(img).enhance(random.uniform(*s["sharpness"]))
-    return img, s["jpeg_quality"]
+    crop = tuple(params["crop"])
+    if not (w - crop[0] - crop[2] > 200 and h - crop[1] - crop[3] > 200):
+        crop = (0, 0, 0, 0)
+    scale = 1.0
+    if max_dimension:
+        scale = max(1.0, max(w - crop[0] - crop[2], h - crop[1] - crop[3]) / max_dimension)
+    img = allocs.image("geometry", _geometric_transform(img, params["angle"], crop, scale))
+    shifts = np.array(params["shifts"], dtype=np.float32)
+    if TILE_PIXELS and img.width * img.height > TILE_PIXELS:
+        return _tiled_kernel_and_sharpen(img, noise, params["noise_sigma"], shifts, params["brightness"], params["contrast"], params["sharpness"], allocs)
+    img = _pixel_kernel(img, noise, params["noise_sigma"], shifts, params["brightness"], params["contrast"], allocs)
+    img = ImageEnhance.Sharpness(img).enhance(params["sharpness"])
+    # Sharpness builds a smoothed copy and then the blended result.
+    allocs.add("sharpen", 2 * image_nbytes(img))
+    return img
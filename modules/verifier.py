@@ -0,0 +1,155 @@
+"""
+VERIFIER — Lee el EXIF de las fotos desde la cabecera (hasta APP1) y lo resume, de una en una o por lotes.
+"""
+import struct
+import zipfile
+import piexif
+
+# {ifd: {tag: name}}, built once at import instead of per value.
+TAG_NAMES = {ifd: {tag: info["name"] for tag, info in tags.items()} for ifd, tags in piexif.TAGS.items()}
+_IFDS = ("0th", "Exif", "GPS", "1st")
+_EXIF_HEADER = b"Exif\x00\x00"
+
+class NotJpeg(ValueError):
+    pass
+
+def read_app1(f):
+    """The EXIF APP1 payload ("Exif\\0\\0" + TIFF) of the JPEG in `f`, or None if it has none.
+
+    Only segment headers are read; other payloads are seeked over, and the
+    walk stops at the EXIF segment or at the start of the scan, so the
+    compressed image data is never touched.
+    """
+    if f.read(2) != b"\xff\xd8":
+        raise NotJpeg("El archivo no es un JPEG")
+    while True:
+        if f.read(1) != b"\xff":
+            return None
+        marker = f.read(1)
+        while marker == b"\xff":
+            marker = f.read(1)
+        if not marker:
+            return None
+        m = marker[0]
+        if m == 0x01 or 0xD0 <= m <= 0xD8:
+            continue
+        if m in (0xD9, 0xDA):
+            return None
+        header = f.read(2)
+        if len(header) < 2:
+            return None
+        length = struct.unpack(">H", header)[0] - 2
+        if m == 0xE1:
+            payload = f.read(length)
+            if payload.startswith(_EXIF_HEADER):
+                return payload
+        else:
+            f.seek(length, 1)
+
+def readable(exif_dict):
+    """{ifd: {tag name: value}} with bytes decoded and tuples as strings; the single-file /api/verify shape."""
+    result = {}
+    for ifd_name in _IFDS:
+        ifd = exif_dict.get(ifd_name)
+        if not isinstance(ifd, dict):
+            continue
+        names = TAG_NAMES.get(ifd_name, {})
+        fields = {}
+        for tag, val in ifd.items():
+            if isinstance(val, bytes):
+                val = val.decode("utf-8", errors="replace")
+            elif isinstance(val, tuple):
+                val = str(val)
+            fields[names.get(tag, str(tag))] = val
+        if fields:
+            result[ifd_name] = fields
+    return result
+
+def verify(f):
+    """readable() of one file's EXIF; JPEGs are read only up to APP1."""
+    try:
+        app1 = read_app1(f)
+        return readable(piexif.load(app1)) if app1 else {}
+    except NotJpeg:
+        # TIFF / WebP: piexif finds the EXIF block itself.
+        f.seek(0)
+        return readable(piexif.load(f.read()))
+
+def _text(val):
+    return val.decode("utf-8", errors="replace").rstrip("\x00") if isinstance(val, bytes) else None
+
+def _ratio(val):
+    return val[0] / val[1] if val and val[1] else 0.0
+
+def _degrees(dms, ref):
+    if not dms or len(dms) != 3:
+        return None
+    deg = _ratio(dms[0]) + _ratio(dms[1]) / 60 + _ratio(dms[2]) / 3600
+    return round(-deg if ref in (b"S", b"W") else deg, 6)
+
+def summarize(name, app1):
+    """Compact summary of one photo from its APP1 payload: camera, capture time, GPS, size.
+
+    Keys without a value are left out, so a batch of hundreds stays small.
+    """
+    if app1 is None:
+        return {"name": name, "exif": False}
+    try:
+        exif = piexif.load(app1)
+    except Exception:
+        return {"name": name, "exif": False, "error": "No se pudo leer EXIF"}
+    ifd0, sub, gps = exif.get("0th") or {}, exif.get("Exif") or {}, exif.get("GPS") or {}
+    summary = {
+        "name": name,
+        "exif": True,
+        "make": _text(ifd0.get(piexif.ImageIFD.Make)),
+        "model": _text(ifd0.get(piexif.ImageIFD.Model)),
+        "software": _text(ifd0.get(piexif.ImageIFD.Software)),
+        "datetime": _text(sub.get(piexif.ExifIFD.DateTimeOriginal) or ifd0.get(piexif.ImageIFD.DateTime)),
+        "description": _text(ifd0.get(piexif.ImageIFD.ImageDescription)),
+        "tags": sum(len(exif.get(i) or {}) for i in _IFDS),
+    }
+    width, height = sub.get(piexif.ExifIFD.PixelXDimension), sub.get(piexif.ExifIFD.PixelYDimension)
+    if width and height:
+        summary["size"] = [width, height]
+    lat = _degrees(gps.get(piexif.GPSIFD.GPSLatitude), gps.get(piexif.GPSIFD.GPSLatitudeRef))
+    lon = _degrees(gps.get(piexif.GPSIFD.GPSLongitude), gps.get(piexif.GPSIFD.GPSLongitudeRef))
+    if lat is not None and lon is not None:
+        summary["gps"] = [lat, lon]
+        if piexif.GPSIFD.GPSAltitude in gps:
+            alt = round(_ratio(gps[piexif.GPSIFD.GPSAltitude]), 1)
+            summary["altitude"] = -alt if gps.get(piexif.GPSIFD.GPSAltitudeRef) == 1 else alt
+    return {k: v for k, v in summary.items() if v is not None}
+
+def summarize_many(items):
+    """summarize() over [(name, app1)]: one engine task per chunk of a batch."""
+    return [summarize(name, app1) for name, app1 in items]
+
+def _header(name, f):
+    try:
+        return name, read_app1(f), None
+    except NotJpeg as e:
+        return name, None, str(e)
+
+def collect(name, f):
+    """[(name, app1, error)] for one upload: a JPEG, or a ZIP of them such as a /api/sanitize output.
+
+    ZIP members are opened one by one and only their headers read; STORED
+    members (the sanitizer's own output) seek without decompressing anything.
+    """
+    if f.read(4) != b"PK\x03\x04":
+        f.seek(0)
+        return [_header(name, f)]
+    f.seek(0)
+    try:
+        archive = zipfile.ZipFile(f)
+    except zipfile.BadZipFile:
+        return [(name, None, "ZIP ilegible")]
+    items = []
+    with archive:
+        for info in archive.infolist():
+            if info.is_dir() or not info.filename.lower().endswith((".jpg", ".jpeg")):
+                continue
+            with archive.open(info) as member:
+                items.append(_header(info.filename, member))
+    return items
@@ -0,0 +1,94 @@
+"""
+ZIPSTREAM — Escribe un ZIP entrada por entrada para enviarlo mientras se genera.
+"""
+import struct
+import time
+import zlib
+import zipfile
+
+_ZIP32_LIMIT = 0xFFFFFFFF
+_ZIP32_COUNT_LIMIT = 0xFFFF
+_FLAGS = 0x800  # UTF-8 names; sizes are in the local header, no data descriptor
+
+def _dos_datetime(ts=None):
+    t = time.localtime(ts)
+    if t.tm_year < 1980:
+        return 0, (1 << 5) | 1
+    return (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2), ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+
+class ZipStream:
+    """Incremental ZIP writer.
+
+    `add()` returns the bytes of one complete entry (local header and data)
+    and `close()` returns the central directory, so the caller can send each
+    piece as soon as it exists and only the small per-entry index stays in
+    memory. Zip64 records are written automatically
+    when sizes, offsets or the entry count outgrow the classic format.
+    """
+
+    def __init__(self, compression=zipfile.ZIP_DEFLATED):
+        self.compression = compression
+        self.offset = 0
+        self._entries = []
+
+    def add(self, name, data, compression=None):
+        method = self.compression if compression is None else compression
+        crc = zlib.crc32(data)
+        usize = len(data)
+        if method == zipfile.ZIP_DEFLATED:
+            co = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+            data = co.compress(data) + co.flush()
+        elif method != zipfile.ZIP_STORED:
+            raise ValueError(f"Unsupported compression: {method}")
+        csize = len(data)
+        zip64 = usize >= _ZIP32_LIMIT or csize >= _ZIP32_LIMIT
+        dostime, dosdate = _dos_datetime()
+        fname = name.encode("utf-8")
+        version = 45 if zip64 else 20
+        # The whole entry is in hand, so the local header carries the real CRC
+        # and sizes and readers that go by local headers alone (streaming
+        # unzippers, seeks into STORED members) need no data descriptor.
+        extra = struct.pack("<HHQQ", 0x0001, 16, usize, csize) if zip64 else b""
+        header = struct.pack(
+            "<IHHHHHIIIHH", 0x04034B50, version, _FLAGS, method, dostime, dosdate,
+            crc, _ZIP32_LIMIT if zip64 else csize, _ZIP32_LIMIT if zip64 else usize, len(fname), len(extra),
+        ) + fname + extra
+        self._entries.append((fname, method, dostime, dosdate, crc, csize, usize, self.offset))
+        chunk = header + data
+        self.offset += len(chunk)
+        return chunk
+
+    def close(self, comment=b""):
+        cd_offset = self.offset
+        central = []
+        for fname, method, dostime, dosdate, crc, csize, usize, offset in self._entries:
+            extra_fields = []
+            if usize >= _ZIP32_LIMIT:
+                extra_fields.append(usize)
+            if csize >= _ZIP32_LIMIT:
+                extra_fields.append(csize)
+            if offset >= _ZIP32_LIMIT:
+                extra_fields.append(offset)
+            extra = struct.pack(f"<HH{len(extra_fields)}Q", 0x0001, 8 * len(extra_fields), *extra_fields) if extra_fields else b""
+            version = 45 if extra_fields else 20
+            central.append(struct.pack(
+                "<IHHHHHHIIIHHHHHII", 0x02014B50, (3 << 8) | version, version, _FLAGS, method, dostime, dosdate,
+                crc, min(csize, _ZIP32_LIMIT), min(usize, _ZIP32_LIMIT), len(fname), len(extra), 0, 0, 0,
+                0o100644 << 16, min(offset, _ZIP32_LIMIT),
+            ) + fname + extra)
+        central = b"".join(central)
+        count = len(self._entries)
+        cd_size = len(central)
+        tail = []
+        if count >= _ZIP32_COUNT_LIMIT or cd_size >= _ZIP32_LIMIT or cd_offset >= _ZIP32_LIMIT:
+            eocd64_offset = cd_offset + cd_size
+            tail.append(struct.pack("<IQHHIIQQQQ", 0x06064B50, 44, 45, 45, 0, 0, count, count, cd_size, cd_offset))
+            tail.append(struct.pack("<IIQI", 0x07064B50, 0, eocd64_offset, 1))
+        comment = comment[:0xFFFF]
+        tail.append(struct.pack(
+            "<IHHHHIIH", 0x06054B50, 0, 0, min(count, _ZIP32_COUNT_LIMIT), min(count, _ZIP32_COUNT_LIMIT),
+            min(cd_size, _ZIP32_LIMIT), min(cd_offset, _ZIP32_LIMIT), len(comment),
+        ) + comment)
+        chunk = central + b"".join(tail)
+        self.offset += len(chunk)
+        return chunk
@@ -56,6 +56,19 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
     // ---- City change -> show preview ----
+    // The city table is fetched once and reused for every later change.
+    let citiesPromise = null;
+    function loadCities() {
+        if (!citiesPromise) {
+            citiesPromise = fetch('/api/cities').then(resp => {
+                if (!resp.ok) throw new Error(`HTTP ${resp.status}`);
+                return resp.json();
+            });
+            citiesPromise.catch(() => { citiesPromise = null; });  // retry on the next change
+        }
+        return citiesPromise;
+    }
+
     citySelect.addEventListener('change', async () => {
         const city = citySelect.value;
         if (!city) {
@@ -64,8 +77,7 @@ document.addEventListener('DOMContentLoaded', () => {
             return;
         }
         try {
-            const resp = await fetch('/api/cities');
-            const data = await resp.json();
+            const data = await loadCities();
             if (data[city]) {
                 const c = data[city];
                 locText.textContent = `📍 ${city}, ${c.department} — ${c.lat.toFixed(4)}°, ${c.lon.toFixed(4)}° — Alt: ${c.altitude}m`;
@@ -115,6 +127,19 @@ document.addEventListener('DOMContentLoaded', () => {
         statusMsg.style.display = 'none';
     }
 
+    // ---- ZIP summary ----
+    async function readZipComment(blob) {
+        // The end-of-central-directory record sits in the last 64 KB + 22 bytes
+        const tail = new Uint8Array(await blob.slice(Math.max(0, blob.size - 65557)).arrayBuffer());
+        for (let i = tail.length - 22; i >= 0; i--) {
+            if (tail[i] === 0x50 && tail[i + 1] === 0x4b && tail[i + 2] === 0x05 && tail[i + 3] === 0x06) {
+                const len = tail[i + 20] | (tail[i + 21] << 8);
+                return new TextDecoder().decode(tail.subarray(i + 22, i + 22 + len));
+            }
+        }
+        return '';
+    }
+
     // ---- Form submit ----
     form.addEventListener('submit', async (e) => {
         e.preventDefault();
@@ -174,10 +199,17 @@ document.addEventListener('DOMContentLoaded', () => {
             a.remove();
             URL.revokeObjectURL(url);
 
-            // Read processing results from headers
-            const gmbProcessed = resp.headers.get('X-GMB-Processed') || '0';
+            // Read processing results from headers, or from the ZIP comment when the
+            // archive was streamed before the counts were known
+            let gmbProcessed = resp.headers.get('X-GMB-Processed');
             const gmbTotal = resp.headers.get('X-GMB-Total') || String(fileInput.files.length);
-            const gmbErrors = resp.headers.get('X-GMB-Errors') || '';
+            let gmbErrors = resp.headers.get('X-GMB-Errors') || '';
+            if (gmbProcessed === null) {
+                const summary = await readZipComment(blob);
+                const [counts, errors] = summary.split('\n');
+                gmbProcessed = (counts || '0').split('/')[0];
+                gmbErrors = errors || '';
+            }
 
             if (parseInt(gmbProcessed) === parseInt(gmbTotal)) {
                 showStatus(`✅ ¡Listo! Se procesaron ${gmbProcessed}/${gmbTotal} foto(s). El archivo ZIP se descargó automáticamente.`, 'success');
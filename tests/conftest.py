@@ -0,0 +1,23 @@
+import os
+import sys
+import tempfile
+from io import BytesIO
+
+import pytest
+
+# Module-level settings are read at import: threads instead of a spawn pool,
+# and a throwaway spool, before anything imports main or modules.jobs.
+os.environ.setdefault("GMB_ENGINE", "thread")
+os.environ.setdefault("GMB_WORKERS", "2")
+os.environ.setdefault("GMB_SPOOL_DIR", tempfile.mkdtemp(prefix="gmb-test-jobs-"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def make_jpeg(width=320, height=240, color=(120, 160, 200)):
+    from PIL import Image
+    buf = BytesIO()
+    Image.new("RGB", (width, height), color).save(buf, "JPEG", quality=90)
+    return buf.getvalue()
+
+@pytest.fixture
+def jpeg():
+    return make_jpeg()
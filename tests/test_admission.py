@@ -0,0 +1,133 @@
+import asyncio
+import threading
+
+import pytest
+
+from modules.admission import MemoryScheduler, peak_bytes
+
+def test_round_robin_between_owners():
+    async def scenario():
+        scheduler = MemoryScheduler(budget=100)
+        order = []
+
+        async def photo(owner, name):
+            granted = await scheduler.acquire(owner, 100)
+            order.append(name)
+            await asyncio.sleep(0)
+            scheduler.release(granted)
+
+        first = await scheduler.acquire("warmup", 100)  # fill the budget so the rest queue up
+        batch = [asyncio.create_task(photo("batch", f"batch{i}")) for i in range(3)]
+        await asyncio.sleep(0)
+        single = asyncio.create_task(photo("single", "single"))
+        await asyncio.sleep(0)
+        assert scheduler.waiting == 4
+        scheduler.release(first)
+        await asyncio.gather(*batch, single)
+        assert order == ["batch0", "single", "batch1", "batch2"]
+        assert scheduler.admitted == scheduler.running == scheduler.waiting == 0
+    asyncio.run(scenario())
+
+def test_photo_bigger_than_the_budget_runs_alone():
+    async def scenario():
+        scheduler = MemoryScheduler(budget=100)
+        granted = await scheduler.acquire("a", 10_000)
+        assert granted == 100 and scheduler.running == 1
+        waiter = asyncio.create_task(scheduler.acquire("b", 1))
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        scheduler.release(granted)
+        scheduler.release(await waiter)
+        assert scheduler.admitted == 0
+    asyncio.run(scenario())
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        scheduler = MemoryScheduler(budget=100)
+        granted = await scheduler.acquire("a", 80)
+        waiter = asyncio.create_task(scheduler.acquire("b", 50))
+        behind = asyncio.create_task(scheduler.acquire("c", 10))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        # With the head gone, the small photo behind it fits at once.
+        assert await behind == 10
+        assert scheduler.waiting == 0
+        scheduler.release(granted)
+        scheduler.release(10)
+        assert scheduler.admitted == scheduler.running == 0
+    asyncio.run(scenario())
+
+def test_run_releases_when_the_task_finishes():
+    async def scenario():
+        scheduler = MemoryScheduler(budget=100)
+
+        async def work(x):
+            assert scheduler.admitted == 60
+            return x * 2
+
+        task = await scheduler.run("a", 60, work, 21)
+        assert await task == 42
+        await asyncio.sleep(0)
+        assert scheduler.admitted == scheduler.running == 0
+    asyncio.run(scenario())
+
+def test_peak_bytes_shrinks_with_max_dimension():
+    full = peak_bytes("JPEG", 4000, 3000, 3 << 20)
+    reduced = peak_bytes("JPEG", 4000, 3000, 3 << 20, max_dimension=1000)
+    assert reduced < full / 4
+    # PNGs can't be draft-decoded, so they keep the full decode cost.
+    assert peak_bytes("PNG", 4000, 3000, 3 << 20, max_dimension=1000) > reduced
+
+def test_cancelled_photo_keeps_its_memory_until_the_worker_is_done():
+    from modules.engine import Engine
+    engine = Engine(workers=1, kind="thread")
+    started, finish = threading.Event(), threading.Event()
+
+    def photo():
+        started.set()
+        finish.wait(5)
+
+    async def scenario():
+        scheduler = MemoryScheduler(budget=100)
+        task = await scheduler.run("a", 100, engine.run, photo)
+        await asyncio.to_thread(started.wait, 5)
+        task.cancel()
+        second = asyncio.create_task(scheduler.acquire("b", 100))
+        await asyncio.sleep(0.05)
+        # The worker is still decoding: its memory stays admitted.
+        assert scheduler.admitted == 100 and not second.done()
+        finish.set()
+        assert await second == 100
+        assert task.cancelled()
+        scheduler.release(100)
+        assert scheduler.admitted == 0
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        finish.set()
+        engine.shutdown()
+
+def test_cancelled_photo_not_started_yet_frees_at_once():
+    from modules.engine import Engine
+    engine = Engine(workers=1, kind="thread")
+    finish = threading.Event()
+
+    async def scenario():
+        scheduler = MemoryScheduler(budget=1000)
+        busy = await scheduler.run("a", 10, engine.run, finish.wait, 5)
+        queued = await scheduler.run("a", 10, engine.run, finish.wait, 5)  # waits for the only worker
+        await asyncio.sleep(0.01)
+        queued.cancel()
+        await asyncio.sleep(0.01)
+        assert queued.cancelled() and scheduler.admitted == 10
+        finish.set()
+        await busy
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        finish.set()
+        engine.shutdown()
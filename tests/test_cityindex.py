@@ -0,0 +1,61 @@
+import pytest
+
+from data.colombia import CITIES
+from modules.cityindex import CityIndex, fold
+
+@pytest.fixture(scope="module")
+def index():
+    return CityIndex(CITIES)
+
+def test_fold():
+    assert fold("  San  Andrés, Isla ") == "san andres isla"
+    assert fold("BOGOTÁ D.C.") == "bogota d c"
+
+@pytest.mark.parametrize("query, expected", [
+    ("Bogotá", "Bogotá"), ("bogota", "Bogotá"), ("BOGOTÁ", "Bogotá"), ("  cucuta ", "Cúcuta"),
+    ("santa marta", "Santa Marta"), ("San Andres", "San Andrés"),
+])
+def test_exact(index, query, expected):
+    assert index.lookup(query) == expected
+
+@pytest.mark.parametrize("query, expected", [
+    ("medel", "Medellín"), ("marta", "Santa Marta"), ("barran", "Barranquilla"), ("villav", "Villavicencio"),
+])
+def test_prefix(index, query, expected):
+    assert index.lookup(query) == expected
+
+@pytest.mark.parametrize("query, expected", [
+    ("quilla", "Barranquilla"), ("gota", "Bogotá"), ("llin", "Medellín"), ("ramanga", "Bucaramanga"), ("dupar", "Valledupar"),
+])
+def test_mid_name(index, query, expected):
+    assert index.lookup(query) == expected
+
+def test_every_piece_of_a_name_finds_a_city_containing_it(index):
+    # What the old substring scan guaranteed; prefixes now win over earlier mid-name matches.
+    for name in CITIES:
+        key = fold(name)
+        for i in range(len(key)):
+            for j in range(i + 3, len(key) + 1):
+                query = key[i:j].strip()
+                assert query in fold(index.lookup(query)), query
+
+@pytest.mark.parametrize("query, expected", [
+    ("bucaramnga", "Bucaramanga"), ("barranqilla", "Barranquilla"), ("villavicenci0", "Villavicencio"), ("medelin", "Medellín"),
+])
+def test_typos(index, query, expected):
+    assert index.lookup(query) == expected
+
+def test_no_match(index):
+    assert index.lookup("") is None
+    assert index.lookup("   ") is None
+    assert index.lookup("xyzzy") is None
+
+def test_ties_go_to_the_first_listed():
+    index = CityIndex(["Sanjuan", "San Juan", "Juanito"])
+    assert index.lookup("san") == "Sanjuan"
+    assert index.lookup("juan") == "San Juan"  # word prefix of the earlier name wins over "Juanito"
+    assert CityIndex(["Alfa", "Beta Alfa"]).lookup("alf") == "Alfa"
+    assert CityIndex(["Xbeta", "Ybeta"]).lookup("bet") == "Xbeta"
+    assert CityIndex(["Casa", "Caza"]).lookup("cas") == "Casa"
+    assert CityIndex(["Abcd", "Abce"]).lookup("abcf") == "Abcd"
+    assert CityIndex(["Abce", "Abcd"]).lookup("abcf") == "Abce"
@@ -0,0 +1,54 @@
+import json
+import os
+import subprocess
+import sys
+
+from tests.conftest import make_jpeg
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _run(src, dst, *extra):
+    subprocess.run(
+        [sys.executable, os.path.join(ROOT, "cli.py"), str(src), str(dst), "--lat", "3.45", "--lon", "-76.53", "--workers", "1", *extra],
+        check=True, capture_output=True, cwd=ROOT,
+    )
+    entries = {}
+    with open(dst / "manifest.jsonl", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if "input" in record:
+                entries[record["input"]] = record
+    return entries
+
+def _save(path, color):
+    path.write_bytes(make_jpeg(color=color))
+
+def test_new_input_does_not_take_over_a_finished_output(tmp_path):
+    src, dst = tmp_path / "in", tmp_path / "out"
+    src.mkdir()
+    _save(src / "a.jpg", (200, 0, 0))
+    _save(src / "c.jpg", (0, 0, 200))
+    first = _run(src, dst, "--keyword", "cafe", "--city", "Cali")
+    assert {k: v["output"] for k, v in first.items()} == {"a.jpg": "cafe-cali-1.jpg", "c.jpg": "cafe-cali-2.jpg"}
+    c_output = (dst / "cafe-cali-2.jpg").read_bytes()
+
+    _save(src / "b.jpg", (0, 200, 0))
+    second = _run(src, dst, "--keyword", "cafe", "--city", "Cali")
+    assert second["c.jpg"]["output"] == "cafe-cali-2.jpg"
+    assert second["b.jpg"]["output"] not in ("cafe-cali-1.jpg", "cafe-cali-2.jpg")
+    assert (dst / "cafe-cali-2.jpg").read_bytes() == c_output
+    assert (dst / second["b.jpg"]["output"]).exists()
+
+def test_inputs_with_the_same_stem_get_distinct_outputs(tmp_path):
+    src, dst = tmp_path / "in", tmp_path / "out"
+    src.mkdir()
+    _save(src / "a.jpg", (200, 0, 0))
+    from PIL import Image
+    Image.new("RGB", (320, 240), (0, 200, 0)).save(src / "a.png")
+    entries = _run(src, dst)
+    outputs = [entries["a.jpg"]["output"], entries["a.png"]["output"]]
+    assert len(set(outputs)) == 2
+    assert all((dst / o).exists() for o in outputs)
+    assert all(e["status"] == "ok" for e in entries.values())
+    # A rerun keeps both names and skips both photos.
+    assert {k: v["output"] for k, v in _run(src, dst).items()} == {"a.jpg": outputs[0], "a.png": outputs[1]}
@@ -0,0 +1,35 @@
+import time
+
+from modules.geocache import MISS, GeoCache, normalize_query
+
+def test_normalize_folds_accents_case_and_punctuation():
+    assert normalize_query("  Cra. 7  #  45-10 ", "BOGOTÁ") == normalize_query("cra 7 # 45 10", "bogota")
+    assert normalize_query("Calle 1", "Cali") != normalize_query("Calle 1", "Cartagena")
+
+def test_lru_eviction_and_stats():
+    cache = GeoCache(maxsize=2)
+    cache.put("a", {"lat": 1.0, "lon": 2.0})
+    cache.put("b", None)
+    assert cache.get("a") == {"lat": 1.0, "lon": 2.0}
+    cache.put("c", {"lat": 3.0, "lon": 4.0})  # "b" is the least recently used
+    assert cache.get("b") is MISS
+    assert cache.get("c") == {"lat": 3.0, "lon": 4.0}
+    assert cache.stats() == {"hits": 2, "misses": 1, "size": 2}
+
+def test_negative_results_expire_sooner():
+    cache = GeoCache(ttl=60, negative_ttl=0.05)
+    cache.put("nada", None)
+    cache.put("algo", {"lat": 1.0, "lon": 2.0})
+    assert cache.get("nada") is None
+    time.sleep(0.1)
+    assert cache.get("nada") is MISS
+    assert cache.get("algo") == {"lat": 1.0, "lon": 2.0}
+
+def test_sqlite_persistence(tmp_path):
+    path = tmp_path / "geocache.sqlite3"
+    GeoCache(path=path).put("calle 1|cali", {"lat": 3.4, "lon": -76.5})
+    GeoCache(path=path).put("sin resultado|cali", None)
+    reopened = GeoCache(path=path)
+    assert reopened.get("calle 1|cali") == {"lat": 3.4, "lon": -76.5}
+    assert reopened.get("sin resultado|cali") is None
+    assert reopened.get("otra|cali") is MISS
@@ -0,0 +1,144 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import httpx
+import pytest
+
+from modules.geocache import GeoCache
+from modules.geoclient import USER_AGENT, GeoClient, NominatimBackend, TokenBucket
+
+class FakeBackend:
+    """Answers once `release` is set; counts the requests that reached it."""
+
+    def __init__(self, point=None, error=None):
+        self.point = point or {"lat": 4.6, "lon": -74.1}
+        self.error = error
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def search(self, address, city=""):
+        self.calls += 1
+        await self.release.wait()
+        if self.error:
+            raise self.error
+        return self.point
+
+    async def aclose(self):
+        pass
+
+def _client(backend):
+    return GeoClient(GeoCache(), backend=backend, limiter=TokenBucket(rate=1000, burst=100))
+
+def test_concurrent_calls_share_one_request():
+    async def scenario():
+        backend = FakeBackend()
+        client = _client(backend)
+        calls = [asyncio.create_task(client.search("Calle 10 # 5-20", "Bogotá")) for _ in range(5)]
+        await asyncio.sleep(0)
+        backend.release.set()
+        results = await asyncio.gather(*calls)
+        assert backend.calls == 1
+        assert results == [backend.point] * 5
+        # The result is cached; later calls don't go upstream.
+        assert await client.search("CALLE 10 # 5-20", "bogota") == backend.point
+        assert backend.calls == 1
+    asyncio.run(scenario())
+
+def test_first_caller_cancelled_does_not_cancel_the_others():
+    async def scenario():
+        backend = FakeBackend()
+        client = _client(backend)
+        first = asyncio.create_task(client.search("Carrera 7", "Bogotá"))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(client.search("Carrera 7", "Bogotá"))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        await asyncio.sleep(0)
+        backend.release.set()
+        assert await second == backend.point
+        assert first.cancelled()
+        assert backend.calls == 1
+        assert client.cache.get("carrera 7|bogota") == backend.point
+    asyncio.run(scenario())
+
+def test_all_callers_cancelled_still_caches_the_answer():
+    async def scenario():
+        backend = FakeBackend()
+        client = _client(backend)
+        only = asyncio.create_task(client.search("Carrera 7", "Medellín"))
+        await asyncio.sleep(0.01)
+        only.cancel()
+        backend.release.set()
+        await asyncio.sleep(0.01)
+        assert client.cache.get("carrera 7|medellin") == backend.point
+        assert not client._inflight
+    asyncio.run(scenario())
+
+def test_backend_error_reaches_every_caller():
+    async def scenario():
+        backend = FakeBackend(error=RuntimeError("upstream down"))
+        client = _client(backend)
+        calls = [asyncio.create_task(client.search("Calle 1", "Cali")) for _ in range(3)]
+        await asyncio.sleep(0)
+        backend.release.set()
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert not client._inflight
+        # Nothing cached: the next call tries again.
+        backend.error = None
+        assert await client.search("Calle 1", "Cali") == backend.point
+        assert backend.calls == 2
+    asyncio.run(scenario())
+
+class StandIn(BaseHTTPRequestHandler):
+    """Local Nominatim stand-in: answers with the server's `results`, or its `status` when it isn't 200."""
+
+    def do_GET(self):
+        self.server.requests.append((urlsplit(self.path), self.headers.get("User-Agent")))
+        body = json.dumps(self.server.results).encode()
+        self.send_response(self.server.status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def nominatim():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    server.requests, server.results, server.status = [], [], 200
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def test_nominatim_backend_against_a_local_server(nominatim):
+    async def scenario():
+        backend = NominatimBackend(base_url=f"http://127.0.0.1:{nominatim.server_port}", timeout=5)
+        try:
+            nominatim.results = [{"lat": "3.4516", "lon": "-76.5320", "display_name": "Cali"},
+                                 {"lat": "0", "lon": "0"}]
+            assert await backend.search("Calle 5 # 38-25", "Cali") == {"lat": 3.4516, "lon": -76.532}
+
+            nominatim.results = []
+            assert await backend.search("Nowhere") is None
+
+            nominatim.status = 503
+            with pytest.raises(httpx.HTTPStatusError):
+                await backend.search("Calle 5", "Cali")
+        finally:
+            await backend.aclose()
+    asyncio.run(scenario())
+
+    url, agent = nominatim.requests[0]
+    assert url.path == "/search"
+    assert parse_qs(url.query) == {"q": ["Calle 5 # 38-25, Cali, Colombia"], "format": ["json"],
+                                   "limit": ["1"], "countrycodes": ["co"]}
+    assert agent == USER_AGENT
+    assert parse_qs(nominatim.requests[1][0].query)["q"] == ["Nowhere, Colombia"]
+    assert len(nominatim.requests) == 3
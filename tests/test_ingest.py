@@ -0,0 +1,62 @@
+import struct
+import zlib
+from io import BytesIO
+
+import pytest
+
+from modules.ingest import RejectedUpload, RequestTooLarge, admit, probe
+from tests.conftest import make_jpeg
+
+def _png(width, height):
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + ihdr + struct.pack(">I", zlib.crc32(b"IHDR" + ihdr))
+
+def test_probe_reads_dimensions_from_the_header():
+    f = BytesIO(make_jpeg(640, 480))
+    assert probe(f) == ("JPEG", 640, 480)
+    assert f.tell() == 0
+    assert probe(BytesIO(_png(1200, 900))) == ("PNG", 1200, 900)
+
+def test_probe_skips_exif_before_the_sof():
+    from modules.injector import build_exif_bytes, inject_exif
+    data = inject_exif(make_jpeg(500, 300), build_exif_bytes(4.6, -74.1, 2640))
+    assert probe(BytesIO(data)) == ("JPEG", 500, 300)
+
+@pytest.mark.parametrize("data", [b"hola mundo", make_jpeg()[:20], _png(0, 10)])
+def test_probe_rejects_unreadable_headers(data):
+    with pytest.raises(RejectedUpload):
+        probe(BytesIO(data))
+
+def test_admit_flags_bad_files_and_keeps_the_rest():
+    uploads = admit([
+        ("ok.jpg", "image/jpeg", BytesIO(make_jpeg(64, 48))),
+        ("vacío.jpg", "image/jpeg", BytesIO(b"")),
+        ("texto.jpg", "image/jpeg", BytesIO(b"no soy una foto")),
+    ])
+    assert uploads[0].error is None and (uploads[0].format, uploads[0].width, uploads[0].height) == ("JPEG", 64, 48)
+    assert uploads[1].error == "Archivo vacío (0 bytes)"
+    assert uploads[2].error == "Formato de imagen no reconocido"
+
+def test_admit_enforces_the_request_budget(monkeypatch):
+    from modules import ingest
+    monkeypatch.setattr(ingest, "MAX_REQUEST_MEGAPIXELS", 0.5)
+    with pytest.raises(RequestTooLarge):
+        admit([(f"{i}.png", "image/png", BytesIO(_png(1000, 1000))) for i in range(2)])
+
+def test_default_limits_admit_200_megapixel_panoramas():
+    from modules import ingest
+    panorama = BytesIO(_png(40_000, 5_000))
+    upload, = admit([("panorama.png", "image/png", panorama)])
+    assert upload.error is None and upload.megapixels == 200
+    assert ingest.MAX_FILE_BYTES >= 100 << 20
+
+def test_decoder_accepts_what_admission_accepts():
+    from PIL import Image
+    from modules.pipeline import process_photo
+    # A small JPEG whose SOF claims 40000 x 5000: it opens, then fails to decode.
+    data = bytearray(make_jpeg(64, 48))
+    sof = data.index(b"\xff\xc0")
+    data[sof + 5:sof + 9] = struct.pack(">HH", 5_000, 40_000)
+    with pytest.raises(Exception) as err:
+        process_photo(bytes(data), {"max_dimension": 1000})  # drafted at 1/8
+    assert not isinstance(err.value, Image.DecompressionBombError)
@@ -0,0 +1,53 @@
+import random
+from datetime import datetime, timedelta
+from io import BytesIO
+
+import piexif
+from PIL import Image
+
+from data.colombia import CITIES, DEVICE_PROFILES
+from modules.injector import build_exif, build_exif_bytes, inject_exif
+from modules.verifier import read_app1
+
+_KEYWORDS = ["", "plomero", "cerrajería 24 horas", "dentista niños"]
+
+def _random_args(rng):
+    lat, lon = rng.uniform(-4.3, 12.5), rng.uniform(-79.0, -66.8)
+    return dict(
+        lat=lat if rng.random() > 0.05 else 0.0,
+        lon=lon,
+        altitude=rng.choice([rng.uniform(0, 3500), -rng.uniform(0, 50), 0.0]),
+        timestamp=rng.choice([None, datetime(2024, 1, 1) + timedelta(seconds=rng.randint(0, 3 * 365 * 86400))]),
+        device_profile=rng.choice([None, rng.choice(DEVICE_PROFILES)]),
+        image_width=rng.choice([None, rng.randint(1, 12000)]),
+        image_height=rng.choice([None, rng.randint(1, 9000)]),
+        keyword=rng.choice(_KEYWORDS),
+        city_name=rng.choice(["", rng.choice(list(CITIES))]),
+    )
+
+def test_template_bytes_identical_to_piexif_dump():
+    rng = random.Random(0)
+    for i in range(500):
+        args = _random_args(rng)
+        random.seed(i)
+        expected = piexif.dump(build_exif(**args))
+        random.seed(i)
+        got = build_exif_bytes(**args)
+        assert got == expected, f"sample {i}: {args}"
+        assert piexif.load(got) == piexif.load(expected)
+
+def test_planned_values_are_used_as_given():
+    exif = piexif.load(build_exif_bytes(4.6, -74.1, 2640, device_profile=DEVICE_PROFILES[0], subsec="123", iso=400, exp_denom=250))
+    assert exif["Exif"][piexif.ExifIFD.SubSecTimeOriginal] == b"123"
+    assert exif["Exif"][piexif.ExifIFD.ISOSpeedRatings] == 400
+    assert exif["Exif"][piexif.ExifIFD.ExposureTime] == (1, 250)
+
+def test_inject_exif_replaces_existing_exif(jpeg):
+    first_payload = build_exif_bytes(4.6, -74.1, 2640, keyword="plomero", city_name="Bogotá")
+    second_payload = build_exif_bytes(6.2, -75.6, 1495, keyword="dentista", city_name="Medellín")
+    out = inject_exif(inject_exif(jpeg, first_payload), second_payload)
+    assert out.count(b"Exif\x00\x00") == 1
+    assert read_app1(BytesIO(out)) == second_payload
+    with Image.open(BytesIO(out)) as img:
+        assert img.size == (320, 240)
+        img.load()
@@ -0,0 +1,158 @@
+import asyncio
+import sqlite3
+import time
+from io import BytesIO
+from urllib.parse import unquote
+
+from fastapi.testclient import TestClient
+
+import main
+from modules.jobs import JobRunner, JobStore
+
+def _wait(client, job_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = client.get(f"/api/jobs/{job_id}").json()
+        if status["status"] in ("done", "failed"):
+            return status
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish")
+
+def test_result_errors_header_with_non_ascii_filename(jpeg):
+    with TestClient(main.app) as client:
+        resp = client.post("/api/jobs", data={"city": "Bogotá"}, files=[
+            ("files", ("ok.jpg", jpeg, "image/jpeg")),
+            ("files", ("照片.jpg", b"", "image/jpeg")),
+        ])
+        assert resp.status_code == 202
+        job_id = resp.json()["id"]
+        assert _wait(client, job_id)["processed"] == 1
+        result = client.get(f"/api/jobs/{job_id}/result")
+    assert result.status_code == 200
+    assert result.headers["X-GMB-Processed"] == "1"
+    assert unquote(result.headers["X-GMB-Errors"]) == "照片.jpg: Archivo vacío (0 bytes)"
+
+def _old_spool(root):
+    # A spool from before job claiming: no owner / heartbeat columns.
+    db = sqlite3.connect(root / "jobs.sqlite3")
+    db.executescript("""
+        CREATE TABLE jobs (id TEXT PRIMARY KEY, status TEXT NOT NULL, options TEXT NOT NULL, created REAL NOT NULL, finished REAL);
+        CREATE TABLE files (job_id TEXT NOT NULL, idx INTEGER NOT NULL, filename TEXT, output TEXT NOT NULL, status TEXT NOT NULL, error TEXT, PRIMARY KEY (job_id, idx));
+        INSERT INTO jobs VALUES ('legacy', 'running', '{}', 0, NULL);
+    """)
+    db.commit()
+    db.close()
+
+def test_only_one_worker_claims_a_job(tmp_path, jpeg):
+    first, second = JobStore(tmp_path), JobStore(tmp_path)
+    job_id = first.create({"keyword": "", "city": ""}, [("a.jpg", BytesIO(jpeg), None)])
+    assert first.unfinished() == second.unfinished() == [job_id]
+    assert first.claim(job_id)
+    assert not second.claim(job_id)
+    assert second.unfinished() == []
+    assert first.get(job_id)["status"] == "running"
+    assert first.renew(job_id) and not second.renew(job_id)
+    first.set_status(job_id, "done")
+    assert not first.claim(job_id) and not second.claim(job_id)
+
+def test_expired_lease_can_be_taken_over(tmp_path, jpeg):
+    dead, alive = JobStore(tmp_path, lease=0.05), JobStore(tmp_path, lease=0.05)
+    job_id = dead.create({"keyword": "", "city": ""}, [("a.jpg", BytesIO(jpeg), None)])
+    assert dead.claim(job_id)
+    assert not alive.claim(job_id)
+    time.sleep(0.1)
+    assert alive.unfinished() == [job_id]
+    assert alive.claim(job_id)
+    assert not dead.renew(job_id)
+
+def test_old_spools_gain_the_lease_columns(tmp_path):
+    _old_spool(tmp_path)
+    store = JobStore(tmp_path)
+    assert store.unfinished() == ["legacy"]
+    assert store.claim("legacy")
+    assert store.get("legacy")["owner"] == store.owner
+
+def _drive(runner, seconds):
+    ran = []
+
+    async def _run(job_id):
+        ran.append(job_id)
+        runner.store.set_status(job_id, "done")
+
+    runner._run = _run
+
+    async def scenario():
+        runner.start()
+        await asyncio.sleep(seconds)
+        await runner.stop()
+
+    asyncio.run(scenario())
+    return ran
+
+def test_runner_skips_jobs_claimed_elsewhere(tmp_path, jpeg):
+    other, mine = JobStore(tmp_path), JobStore(tmp_path)
+    job_id = other.create({"keyword": "", "city": ""}, [("a.jpg", BytesIO(jpeg), None)])
+    assert other.claim(job_id)
+    assert _drive(JobRunner(mine), 0.05) == []
+    assert mine.get(job_id)["owner"] == other.owner
+
+def test_runner_adopts_jobs_of_a_dead_worker(tmp_path, jpeg):
+    dead, mine = JobStore(tmp_path, lease=0.1), JobStore(tmp_path, lease=0.1)
+    job_id = dead.create({"keyword": "", "city": ""}, [("a.jpg", BytesIO(jpeg), None)])
+    assert dead.claim(job_id)
+    assert _drive(JobRunner(mine), 0.35) == [job_id]
+    assert mine.get(job_id)["owner"] == mine.owner
+
+def test_lost_claim_stops_the_job_and_keeps_its_inputs(tmp_path, jpeg, monkeypatch):
+    from modules import jobs
+
+    def slow(path, job):
+        time.sleep(0.3)
+        return jobs.process_photo(open(path, "rb").read(), job)
+
+    monkeypatch.setattr(jobs, "_process_spooled", slow)
+    mine, other = JobStore(tmp_path, lease=0.15), JobStore(tmp_path, lease=0.15)
+    opts = {"keyword": "", "city": "", "location": {"lat": 4.6, "lon": -74.1}, "intensity": "low",
+            "date_from": "2024-01-01T00:00:00", "date_to": "2024-01-02T00:00:00", "jitter_radius": 30.0,
+            "device_id": None, "random_device": True, "max_dimension": None, "seed": 1}
+    job_id = mine.create(opts, [("a.jpg", BytesIO(jpeg), None)])
+    runner = JobRunner(mine)
+
+    async def scenario():
+        runner.start()
+        await asyncio.sleep(0.05)
+        # Another worker takes the job over (as if this one had stalled past its lease).
+        other._update("UPDATE jobs SET owner = ?, heartbeat = ? WHERE id = ?", (other.owner, time.time() + 60, job_id))
+        await asyncio.sleep(0.6)  # well past the photo, so a runner that ignored the takeover would be done
+        assert not runner._task.done()  # only the job stopped, not the runner
+        await runner.stop()
+
+    asyncio.run(scenario())
+    job = mine.get(job_id)
+    assert (job["status"], job["owner"]) == ("running", other.owner)
+    assert mine.input_path(job_id, 0).exists()
+    assert job["files"][0]["status"] == "pending"
+
+def test_heartbeat_survives_database_errors(tmp_path):
+    store = JobStore(tmp_path, lease=0.09)
+    runner = JobRunner(store)
+    calls = []
+
+    def renew(job_id):
+        calls.append(job_id)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return True
+
+    store.renew = renew
+
+    async def scenario():
+        run = asyncio.create_task(asyncio.sleep(10))
+        heartbeat = asyncio.create_task(runner._heartbeat("job", run))
+        await asyncio.sleep(0.15)
+        assert not heartbeat.done() and not run.cancelled()
+        heartbeat.cancel()
+        run.cancel()
+
+    asyncio.run(scenario())
+    assert len(calls) >= 3
@@ -0,0 +1,41 @@
+import hashlib
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from modules.noise import STRIP_ALIGN, NoiseSource
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _noise_digest(seed, pool, shape=(300, 500, 3)):
+    buf = np.zeros(shape, dtype=np.float32)
+    NoiseSource(seed, pool=pool).add_to(buf, 3.0)
+    return hashlib.sha256(buf.tobytes()).hexdigest()
+
+_CHILD = "import sys; sys.path.insert(0, sys.argv[1]); from tests.test_noise import _noise_digest; print(_noise_digest(1234, sys.argv[2] == '1'))"
+
+@pytest.mark.parametrize("pool", [False, True])
+def test_seed_replays_noise_in_another_process(pool):
+    here = _noise_digest(1234, pool)
+    there = subprocess.run([sys.executable, "-c", _CHILD, ROOT, "1" if pool else "0"], capture_output=True, text=True, check=True).stdout.strip()
+    assert here == there
+    assert here != _noise_digest(1235, pool)
+
+@pytest.mark.parametrize("pool", [False, True])
+def test_aligned_strips_draw_what_the_whole_frame_draws(pool):
+    whole = np.zeros((3 * STRIP_ALIGN + 17, 300, 3), dtype=np.float32)
+    NoiseSource(7, pool=pool).add_to(whole, 2.0)
+    strips = np.zeros_like(whole)
+    source = NoiseSource(7, pool=pool)
+    for y in range(0, strips.shape[0], STRIP_ALIGN):
+        source.add_to(strips[y:y + STRIP_ALIGN], 2.0)
+    np.testing.assert_array_equal(whole, strips)
+
+def test_noise_is_zero_mean_with_the_requested_sigma():
+    buf = np.zeros((512, 512, 3), dtype=np.float32)
+    NoiseSource(99).add_to(buf, 4.0)
+    assert abs(buf.mean()) < 0.05
+    assert abs(buf.std() - 4.0) < 0.05
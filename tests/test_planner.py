@@ -0,0 +1,31 @@
+from modules.planner import new_seed, plan_batch
+
+OPTS = {
+    "location": {"lat": 4.6097, "lon": -74.0817, "altitude": 2640, "postal_code": "110111"},
+    "city": "Bogotá", "keyword": "plomero", "intensity": "medium",
+    "date_from": "2024-01-01T00:00:00", "date_to": "2024-02-01T00:00:00", "jitter_radius": 30.0,
+    "device_id": None, "random_device": True, "max_dimension": None, "seed": None,
+    "encoder_profile": "balanced",
+}
+
+def _rows(plan):
+    return [plan.row(i) for i in range(len(plan))]
+
+def test_same_seed_same_plan():
+    assert _rows(plan_batch(20, OPTS, 1234)) == _rows(plan_batch(20, OPTS, 1234))
+    assert _rows(plan_batch(20, OPTS, 1234)) != _rows(plan_batch(20, OPTS, 1235))
+
+def test_rows_are_plain_values_within_the_options():
+    seed = new_seed()
+    plan = plan_batch(50, OPTS, seed)
+    assert plan.seed == seed
+    for row in _rows(plan):
+        assert abs(row["lat"] - 4.6097) <= 30 / 111_000 and abs(row["lon"] + 74.0817) <= 30 / 111_000
+        assert "2024-01-01" <= row["timestamp"].isoformat() <= "2024-02-01T23:59:59"
+        assert 7 <= row["timestamp"].hour < 20
+        assert isinstance(row["quality"], int) and isinstance(row["uniquify"]["noise_seed"], int)
+        assert row["city"] == "Bogotá" and row["keyword"] == "plomero"
+
+def test_fixed_device():
+    plan = plan_batch(10, {**OPTS, "device_id": 2, "random_device": False}, 7)
+    assert len({row["device"]["model"] for row in _rows(plan)}) == 1
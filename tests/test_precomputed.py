@@ -0,0 +1,74 @@
+import gzip
+
+import pytest
+from starlette.requests import Request
+
+from modules import precomputed
+from modules.precomputed import Precomputed, _accepted, _matches
+
+BODY = b'{"ciudades": ["Bogot\\u00e1", "Medell\\u00edn", "Cali"]}' * 50
+
+def _request(**headers):
+    raw = [(k.replace("_", "-").lower().encode(), v.encode()) for k, v in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+@pytest.fixture
+def page(monkeypatch):
+    monkeypatch.setattr(precomputed, "brotli", None)  # gzip only, whatever is installed
+    return Precomputed(BODY, "application/json", "public, max-age=3600")
+
+def test_accepted_codings_honour_q():
+    assert _accepted("gzip, br;q=0.5, deflate;q=0") == {"gzip", "br"}
+    assert _accepted("GZIP ; q=0.0") == set()
+    assert _accepted("gzip;q=abc, *") == {"*"}
+    assert not _accepted(None) & {"gzip", "br", "*"}
+
+def test_matches_weak_and_wildcard_tags():
+    assert _matches('"abc"', '"abc"')
+    assert _matches('W/"abc"', '"abc"')
+    assert _matches('"x", W/"abc"', '"abc"')
+    assert _matches("*", '"abc"')
+    assert not _matches('"abcd"', '"abc"')
+    assert not _matches("", '"abc"')
+
+def test_gzip_variant_when_accepted(page):
+    resp = page.response(_request(accept_encoding="br, gzip"))
+    assert resp.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(resp.body) == BODY
+    assert resp.headers["vary"] == "Accept-Encoding"
+    assert resp.headers["cache-control"] == "public, max-age=3600"
+    assert resp.headers["etag"].endswith('-gzip"')
+
+@pytest.mark.parametrize("accept", [None, "gzip;q=0", "identity", "br"])
+def test_identity_otherwise(page, accept):
+    resp = page.response(_request(**({"accept_encoding": accept} if accept else {})))
+    assert "content-encoding" not in resp.headers
+    assert resp.body == BODY
+    assert resp.headers["content-type"] == "application/json"
+
+def test_wildcard_gets_a_compressed_variant(page):
+    assert page.response(_request(accept_encoding="*")).headers["content-encoding"] == "gzip"
+
+def test_304_for_a_matching_etag(page):
+    etag = page.response(_request(accept_encoding="gzip")).headers["etag"]
+    for if_none_match in (etag, f"W/{etag}", f'"otro", {etag}', "*"):
+        resp = page.response(_request(accept_encoding="gzip", if_none_match=if_none_match))
+        assert resp.status_code == 304
+        assert resp.body == b""
+        assert resp.headers["etag"] == etag
+        assert resp.headers["cache-control"] == "public, max-age=3600"
+        assert "content-encoding" not in resp.headers
+
+def test_etag_of_another_variant_does_not_match(page):
+    gzip_etag = page.response(_request(accept_encoding="gzip")).headers["etag"]
+    assert page.response(_request(if_none_match=gzip_etag)).status_code == 200
+
+def test_etag_follows_the_content():
+    first = Precomputed(BODY, "application/json", "no-cache")
+    assert first.variants["identity"][1] == Precomputed(BODY, "application/json", "no-cache").variants["identity"][1]
+    assert first.variants["identity"][1] != Precomputed(BODY + b" ", "application/json", "no-cache").variants["identity"][1]
+
+def test_variants_that_do_not_shrink_are_dropped():
+    tiny = Precomputed(b"{}", "application/json", "no-cache")
+    assert set(tiny.variants) == {"identity"}
+    assert "content-encoding" not in tiny.response(_request(accept_encoding="gzip")).headers
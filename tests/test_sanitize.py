@@ -0,0 +1,128 @@
+import asyncio
+import inspect
+import zipfile
+from io import BytesIO
+from types import SimpleNamespace
+from urllib.parse import unquote
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from modules.pipeline import ENCODER_PROFILES
+from modules.verifier import read_app1
+from tests.conftest import make_jpeg
+
+FORM = {"city": "Bogotá", "keyword": "plomero"}
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as c:
+        yield c
+
+def _files(*items):
+    return [("files", (name, data, "image/jpeg")) for name, data in items]
+
+def test_zip_streams_photos_report_and_comment(client):
+    photos = [make_jpeg(color=(40 * i, 100, 200)) for i in range(3)]
+    resp = client.post("/api/sanitize", data=FORM, files=_files(*((f"{i}.jpg", p) for i, p in enumerate(photos))))
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "application/zip"
+    assert resp.headers["X-GMB-Total"] == "3"
+    with zipfile.ZipFile(BytesIO(resp.content)) as z:
+        names = z.namelist()
+        assert names == ["plomero-bogota-1.jpg", "plomero-bogota-2.jpg", "plomero-bogota-3.jpg", "_reporte.txt"]
+        assert z.comment.decode() == "3/3\n"
+        assert z.read("_reporte.txt").decode() == "Procesadas: 3/3\n"
+        for name in names[:3]:
+            assert z.getinfo(name).compress_type == zipfile.ZIP_STORED
+            with z.open(name) as member:
+                assert read_app1(member) is not None
+
+def test_rejected_uploads_are_reported_and_the_rest_processed(client):
+    resp = client.post("/api/sanitize", data=FORM, files=_files(("ok.jpg", make_jpeg()), ("vacío.jpg", b""), ("texto.jpg", b"no soy una foto")))
+    assert resp.status_code == 200
+    with zipfile.ZipFile(BytesIO(resp.content)) as z:
+        assert z.namelist() == ["plomero-bogota-1.jpg", "_reporte.txt"]
+        assert z.comment.decode() == "1/3\nvacío.jpg: Archivo vacío (0 bytes); texto.jpg: Formato de imagen no reconocido"
+        report = z.read("_reporte.txt").decode()
+        assert report.startswith("Procesadas: 1/3\n\nErrores:\n")
+        assert "vacío.jpg: Archivo vacío (0 bytes)" in report
+
+def test_request_over_the_byte_budget_is_413(client, monkeypatch):
+    from modules import ingest
+    monkeypatch.setattr(ingest, "MAX_REQUEST_BYTES", 1000)
+    resp = client.post("/api/sanitize", data=FORM, files=_files(("a.jpg", make_jpeg()), ("b.jpg", make_jpeg())))
+    assert resp.status_code == 413
+    assert "límite" in resp.json()["detail"]
+
+def test_tar_output(client):
+    import tarfile
+    resp = client.post("/api/sanitize", data={**FORM, "output": "tar"}, files=_files(("a.jpg", make_jpeg()), ("b.jpg", b"")))
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "application/x-tar"
+    assert resp.headers["content-disposition"].endswith('.tar"')
+    with tarfile.open(fileobj=BytesIO(resp.content)) as tar:
+        assert tar.getnames() == ["plomero-bogota-1.jpg", "_reporte.txt"]
+        assert read_app1(tar.extractfile("plomero-bogota-1.jpg")) is not None
+        assert tar.extractfile("_reporte.txt").read().decode().startswith("Procesadas: 1/2\n")
+
+def test_jpeg_output(client):
+    resp = client.post("/api/sanitize", data={**FORM, "output": "jpeg"}, files=_files(("foto.jpg", make_jpeg())))
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "image/jpeg"
+    assert resp.headers["X-GMB-Processed"] == "1" and resp.headers["X-GMB-Errors"] == ""
+    assert "plomero-bogota-1.jpg" in resp.headers["content-disposition"]
+    assert read_app1(BytesIO(resp.content)) is not None
+
+def test_jpeg_output_error_is_422_with_encoded_header(client):
+    resp = client.post("/api/sanitize", data={**FORM, "output": "jpeg"}, files=_files(("照片.jpg", b"no soy una foto")))
+    assert resp.status_code == 422
+    assert resp.headers["X-GMB-Processed"] == "0"
+    assert unquote(resp.headers["X-GMB-Errors"]) == "照片.jpg: Formato de imagen no reconocido"
+    assert resp.json()["detail"] == "照片.jpg: Formato de imagen no reconocido"
+
+@pytest.mark.parametrize("data, count", [({"output": "jpeg"}, 2), ({"output": "rar"}, 1)])
+def test_invalid_output_requests_are_400(client, data, count):
+    resp = client.post("/api/sanitize", data={**FORM, **data}, files=_files(*((f"{i}.jpg", make_jpeg()) for i in range(count))))
+    assert resp.status_code == 400
+
+def test_seed_replays_a_batch(client):
+    photos = _files(("a.jpg", make_jpeg(color=(10, 20, 30))), ("b.jpg", make_jpeg(color=(200, 100, 50))))
+    first = client.post("/api/sanitize", data=FORM, files=photos)
+    seed = first.headers["X-GMB-Seed"]
+    again = client.post("/api/sanitize", data={**FORM, "seed": seed}, files=photos)
+    other = client.post("/api/sanitize", data={**FORM, "seed": str(int(seed) + 1)}, files=photos)
+    assert again.headers["X-GMB-Seed"] == seed
+
+    def members(resp):
+        with zipfile.ZipFile(BytesIO(resp.content)) as z:
+            return {n: z.read(n) for n in z.namelist() if n.endswith(".jpg")}
+
+    assert members(again) == members(first)
+    assert members(other) != members(first)
+
+def test_seed_replays_a_single_jpeg(client):
+    photo = _files(("a.jpg", make_jpeg(color=(10, 20, 30))))
+    first = client.post("/api/sanitize", data={**FORM, "output": "jpeg"}, files=photo)
+    again = client.post("/api/sanitize", data={**FORM, "output": "jpeg", "seed": first.headers["X-GMB-Seed"]}, files=photo)
+    assert again.headers["X-GMB-Seed"] == first.headers["X-GMB-Seed"]
+    assert again.content == first.content
+
+def test_form_leaves_the_encoder_profile_to_the_server(client, monkeypatch):
+    page = client.get("/").text
+    assert 'value="">Predeterminada del servidor</option>' in page
+    assert 'value="balanced" selected' not in page
+
+    defaults = {name: p.default.default for name, p in inspect.signature(main.sanitize_options).parameters.items()
+                if name != "request"}
+    profile = next(p for p in ENCODER_PROFILES if p != main.DEFAULT_ENCODER_PROFILE)
+    monkeypatch.setattr(main, "DEFAULT_ENCODER_PROFILE", profile)
+
+    def options(**fields):
+        request = SimpleNamespace(state=SimpleNamespace())
+        return asyncio.run(main.sanitize_options(request, **{**defaults, **FORM, **fields}))
+
+    assert options()["encoder_profile"] == profile
+    assert options(encoder_profile="nope")["encoder_profile"] == profile
+    assert options(encoder_profile="fast")["encoder_profile"] == "fast"
@@ -0,0 +1,24 @@
+import tarfile
+from io import BytesIO
+
+from modules.tarstream import TarStream
+
+def test_round_trip_with_unicode_names():
+    stream = TarStream()
+    photo = bytes(range(256)) * 3 + b"x"  # not a multiple of the block size
+    archive = stream.add("fotos/café 照片.jpg", photo) + stream.add("_reporte.txt", b"Procesadas: 1/1\n")
+    archive += stream.close(b"ignored")
+    assert len(archive) % 512 == 0
+    assert stream.offset == len(archive)
+    with tarfile.open(fileobj=BytesIO(archive)) as tar:
+        members = tar.getmembers()
+        assert [m.name for m in members] == ["fotos/café 照片.jpg", "_reporte.txt"]
+        assert tar.extractfile(members[0]).read() == photo
+        assert tar.extractfile(members[1]).read() == b"Procesadas: 1/1\n"
+        assert members[0].mode == 0o644
+
+def test_streams_can_be_read_before_close():
+    stream = TarStream()
+    partial = stream.add("a.jpg", b"a" * 700)
+    with tarfile.open(fileobj=BytesIO(partial + b"\0" * 1024)) as tar:
+        assert tar.extractfile("a.jpg").read() == b"a" * 700
@@ -0,0 +1,65 @@
+import struct
+import zipfile
+import zlib
+from io import BytesIO
+
+import pytest
+
+from modules.zipstream import ZipStream
+
+def _local_header(archive, offset):
+    sig, _, flags, method, _, _, crc, csize, usize, name_len, extra_len = struct.unpack_from("<IHHHHHIIIHH", archive, offset)
+    assert sig == 0x04034B50
+    return flags, method, crc, csize, usize, name_len, extra_len
+
+def test_round_trip_with_unicode_names_and_comment():
+    stream = ZipStream(zipfile.ZIP_STORED)
+    photo = bytes(range(256)) * 40
+    report = "Procesadas: 1/1\n".encode() * 50
+    archive = stream.add("fotos/café 照片.jpg", photo) + stream.add("_reporte.txt", report, compression=zipfile.ZIP_DEFLATED)
+    archive += stream.close(b"1/1\n")
+    with zipfile.ZipFile(BytesIO(archive)) as z:
+        assert z.testzip() is None
+        assert z.comment == b"1/1\n"
+        assert [i.filename for i in z.infolist()] == ["fotos/café 照片.jpg", "_reporte.txt"]
+        assert [i.compress_type for i in z.infolist()] == [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED]
+        assert z.read("fotos/café 照片.jpg") == photo
+        assert z.read("_reporte.txt") == report
+    assert stream.offset == len(archive)
+
+def test_entries_carry_real_sizes_and_no_data_descriptor():
+    stream = ZipStream(zipfile.ZIP_STORED)
+    photo = b"\xff\xd8" + b"x" * 1000 + b"\xff\xd9"
+    stored = stream.add("foto.jpg", photo)
+    flags, method, crc, csize, usize, name_len, extra_len = _local_header(stored, 0)
+    assert method == zipfile.ZIP_STORED
+    assert not flags & 0x08
+    assert (crc, csize, usize) == (zlib.crc32(photo), len(photo), len(photo))
+    # Header and data, nothing after.
+    assert len(stored) == 30 + name_len + extra_len + len(photo)
+    assert stored.endswith(photo)
+
+    deflated = stream.add("_reporte.txt", b"abc" * 100, compression=zipfile.ZIP_DEFLATED)
+    flags, method, crc, csize, usize, name_len, extra_len = _local_header(deflated, 0)
+    assert method == zipfile.ZIP_DEFLATED and not flags & 0x08
+    assert (crc, usize) == (zlib.crc32(b"abc" * 100), 300)
+    assert len(deflated) == 30 + name_len + extra_len + csize
+
+    archive = stored + deflated + stream.close()
+    with zipfile.ZipFile(BytesIO(archive)) as z:
+        for info in z.infolist():
+            assert not info.flag_bits & 0x08
+            local_flags = _local_header(archive, info.header_offset)[0]
+            assert local_flags == info.flag_bits
+
+def test_zip64_entry_count():
+    stream = ZipStream(zipfile.ZIP_STORED)
+    parts = [stream.add(f"{i}.txt", b"") for i in range(0x10000)]
+    archive = b"".join(parts) + stream.close()
+    with zipfile.ZipFile(BytesIO(archive)) as z:
+        assert len(z.infolist()) == 0x10000
+        assert z.read("65535.txt") == b""
+
+def test_unsupported_compression():
+    with pytest.raises(ValueError):
+        ZipStream().add("a.txt", b"a", compression=zipfile.ZIP_BZIP2)